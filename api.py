@@ -1,62 +1,243 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import pandas as pd
+import numpy as np
 import joblib
+import cProfile
+import concurrent.futures
+import itertools
+import json
+import os
+import random
+import threading
+import time
 import warnings
+from facility_geo import add_proximity_features, load_geo_index
+from fast_inference import CompiledModel, COMPILED_MODEL_FILE, NATIVE_MODEL_FILE, SCHEMA_FILE
+from feature_encoder import FeatureEncoder
+from features import BOOLEAN_COLS, create_features
+from micro_batcher import MicroBatcher, QueueFull
+from prediction_cache import PredictionCache, feature_key
+from service_metrics import Counter, Gauge, Histogram, Registry, ROW_BUCKETS, SIZE_BUCKETS
 
 # --- Setup ---
 warnings.filterwarnings('ignore')
 app = Flask(__name__)
 CORS(app) # Enable Cross-Origin Resource Sharing
 
+# --- Metrics ---
+# Exposed in Prometheus text format at /metrics. Stages: parse (JSON decode), features
+# (create_features + proximity features), encode (FeatureEncoder), cache (prediction cache lookups), predict
+# (predict_proba), explain (TreeSHAP contributions), nearby (spatial index queries) and
+# serialize (jsonify).
+metrics = Registry()
+REQUESTS = metrics.register(Counter('esg_requests_total', 'HTTP requests by endpoint and status.', ['endpoint', 'status']))
+REQUEST_SECONDS = metrics.register(Histogram('esg_request_duration_seconds', 'End-to-end request latency.', ['endpoint']))
+STAGE_SECONDS = metrics.register(Histogram('esg_stage_duration_seconds', 'Time spent in each hot-path stage.', ['stage']))
+PAYLOAD_BYTES = metrics.register(Histogram('esg_request_payload_bytes', 'Request body size.', ['endpoint'], buckets=SIZE_BUCKETS))
+MODEL_ROWS = metrics.register(Histogram('esg_model_batch_rows', 'Rows per model call.', ['source'], buckets=ROW_BUCKETS))
+for cache_counter in ['hits', 'misses', 'evictions', 'expirations']:
+    metrics.register(Gauge(
+        f'esg_prediction_cache_{cache_counter}_total', f'Prediction cache {cache_counter}.',
+        lambda cache_counter=cache_counter: prediction_cache.stats()[cache_counter] if prediction_cache else 0, 'counter'))
+metrics.register(Gauge('esg_prediction_cache_size', 'Entries in the prediction cache.',
+                       lambda: prediction_cache.stats()['size'] if prediction_cache else 0))
+
+# --- Profiling Hook ---
+# With ESG_PROFILE_ENABLED=1, a request sent with 'X-Profile: 1' (or picked at random with
+# probability ESG_PROFILE_SAMPLE_RATE) is run under cProfile and the dump is written to
+# ESG_PROFILE_DIR; the file name comes back in the X-Profile-File response header.
+PROFILE_ENABLED = os.environ.get('ESG_PROFILE_ENABLED') == '1'
+PROFILE_SAMPLE_RATE = float(os.environ.get('ESG_PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.environ.get('ESG_PROFILE_DIR', 'profiles')
+# Only one cProfile session can be active per interpreter, so concurrent requests are not profiled.
+profile_lock = threading.Lock()
+# Dump names carry the pid and a per-process sequence number, so neither two requests in the
+# same second nor two workers sharing ESG_PROFILE_DIR overwrite each other's dumps.
+profile_sequence = itertools.count(1)
+
 # --- Load Trained Model and Helper Files ---
+MODEL_FILE = 'esg_risk_model.pkl'
+COMPILED_MODEL = os.environ.get('ESG_COMPILED_MODEL') == '1'
 try:
-    model = joblib.load('esg_risk_model.pkl')
-    model_columns = joblib.load('model_columns.pkl')
-    label_encoder = joblib.load('label_encoder.pkl')
+    if COMPILED_MODEL:
+        # NumPy-only evaluation of the same trees (see fast_inference.py). Nothing is unpickled:
+        # the model columns and class labels come from the model schema.
+        model = CompiledModel.load(COMPILED_MODEL_FILE, SCHEMA_FILE)
+        classes = model.classes_
+        feature_encoder = FeatureEncoder(model.columns)
+    else:
+        model = joblib.load(MODEL_FILE)
+        classes = joblib.load('label_encoder.pkl').classes_
+        try:
+            feature_encoder = joblib.load('feature_encoder.pkl')
+        except FileNotFoundError:
+            # Older training runs only saved model_columns.pkl; the encoder can be rebuilt from it.
+            feature_encoder = FeatureEncoder(joblib.load('model_columns.pkl'))
     print("✅ Tuned model and helper files loaded successfully.")
 except FileNotFoundError:
     print("❌ Error: Model files not found. Please run the training script first.")
     model = None
 
-# --- Recreate the Feature Engineering Pipeline ---
-def create_features(df):
-    # This function contains all the logic from your step2 script
-    GEOPOLITICAL_RISK = {'India': 3, 'China': 4, 'Vietnam': 2, 'Bangladesh': 4, 'USA': 1, 'Turkey': 3, 'Pakistan': 5, 'Brazil': 3, 'Morocco': 3}
-    df['geopolitical_risk'] = df['country'].map(GEOPOLITICAL_RISK).fillna(3)
+# --- Explainer ---
+# Built on the first /explain call, so processes that only predict never load XGBoost's
+# TreeSHAP booster. The compiled model has no booster; it is read from the native model file.
+explainer = None
+explainer_lock = threading.Lock()
 
-    df['industry_description'] = df.apply(
-        lambda row: row.get('processing_type') if pd.notna(row.get('processing_type')) else row.get('industryVertical'),
-        axis=1
-    )
-    INDUSTRY_RISK = {'Dyeing': 5, 'Printing': 4, 'Finishing': 5, 'Spinning': 4, 'Weaving': 3, 'Manufacturing': 3, 'Logistics': 1, 'Packaging': 1, 'Unspecified': 2}
-    def map_industry_risk(desc):
-        for risk_word, score in INDUSTRY_RISK.items():
-            if risk_word.lower() in str(desc).lower(): return score
-        return 2
-    df['industry_risk'] = df['industry_description'].apply(map_industry_risk)
-
-    def parse_workers(worker_str):
-        worker_str = str(worker_str)
-        if '5001+' in worker_str: return 7500
-        if '-' in worker_str:
-            try:
-                low, high = map(int, worker_str.split('-'))
-                return (low + high) / 2
-            except: return 0
-        return 0
-    df['worker_count_avg'] = df['number_of_workers'].apply(parse_workers)
-    df['emission_intensity'] = df.apply(
-        lambda row: row['total_emissions_kg_co2e'] / row['worker_count_avg'] if row['worker_count_avg'] > 0 else 0,
-        axis=1
+def get_explainer():
+    global explainer
+    with explainer_lock:
+        if explainer is None:
+            from explainer import Explainer
+            if COMPILED_MODEL:
+                explainer = Explainer.load(NATIVE_MODEL_FILE, feature_encoder, classes)
+            else:
+                explainer = Explainer(model.get_booster(), feature_encoder, classes)
+    return explainer
+
+# --- Facility Spatial Index ---
+# KD-tree over the facilities export (facility_geo.py). It backs /nearby and the proximity
+# features step2 trains on; without the cache /nearby is unavailable and the features are NaN.
+# Only opens the cache: serve.py builds it in the parent before the workers start.
+geo_index = load_geo_index()
+
+def featurize(df):
+    featured_df = create_features(df)
+    add_proximity_features(featured_df, geo_index)
+    return featured_df
+
+# --- Prediction Cache ---
+# Keyed on the encoded feature vector, so payloads that only differ in key order or in
+# fields the model ignores (e.g. 'name') share an entry. ESG_CACHE_SIZE=0 disables it.
+CACHE_SIZE = int(os.environ.get('ESG_CACHE_SIZE', 10000))
+prediction_cache = None
+if CACHE_SIZE > 0:
+    prediction_cache = PredictionCache(CACHE_SIZE, float(os.environ.get('ESG_CACHE_TTL_S', 300)))
+
+def run_model(model_input, source):
+    MODEL_ROWS.observe(len(model_input), source=source)
+    with STAGE_SECONDS.time(stage='predict'):
+        return model.predict_proba(model_input)
+
+def predict_proba_cached(model_input, source):
+    if prediction_cache is None:
+        return run_model(model_input, source)
+    with STAGE_SECONDS.time(stage='cache'):
+        keys = [feature_key(row) for row in model_input]
+        prediction_proba = np.empty((len(keys), len(classes)), dtype=np.float32)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = prediction_cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                prediction_proba[i] = cached
+    # Only the rows not already cached go through the model, still as a single call.
+    if missing:
+        fresh_proba = run_model(model_input[missing], source)
+        for i, row_proba in zip(missing, fresh_proba):
+            prediction_proba[i] = row_proba
+            prediction_cache.put(keys[i], row_proba)
+    return prediction_proba
+
+# --- Micro-batching ---
+# Off by default. serve.py (or ESG_MICRO_BATCH=1) turns it on so concurrent /predict calls
+# arriving within a few milliseconds are featurized and scored as one batch.
+micro_batcher = None
+PREDICT_TIMEOUT_S = float(os.environ.get('ESG_PREDICT_TIMEOUT_S', 10))
+
+def score_records(records):
+    with STAGE_SECONDS.time(stage='features'):
+        featured_df = featurize(pd.DataFrame(records))
+    # Records arrive through validate_record, so missing fields are already NaN; encoding record
+    # by record also types each value exactly as it would be on its own.
+    with STAGE_SECONDS.time(stage='encode'):
+        model_input = feature_encoder.transform(featured_df.to_dict('records'))
+    return predict_proba_cached(model_input, source='micro_batch')
+
+if model and os.environ.get('ESG_MICRO_BATCH') == '1':
+    micro_batcher = MicroBatcher(
+        score_records,
+        max_batch_size=int(os.environ.get('ESG_BATCH_MAX_SIZE', 64)),
+        max_wait_ms=float(os.environ.get('ESG_BATCH_MAX_WAIT_MS', 5)),
+        max_queue_size=int(os.environ.get('ESG_BATCH_QUEUE_SIZE', 1024)),
     )
-    
-    df['is_iso14001_certified'] = df['is_iso14001_certified'].astype(bool)
-    df['is_sa8000_certified'] = df['is_sa8000_certified'].astype(bool)
-    df['has_anti_corruption_policy'] = df['has_anti_corruption_policy'].astype(bool)
-    df['publishes_esg_report'] = df['publishes_esg_report'].astype(bool)
-    
-    return df
+
+# --- Encoding Helpers ---
+def build_model_input(df):
+    with STAGE_SECONDS.time(stage='features'):
+        featured_df = featurize(df)
+    # The fitted encoder writes numeric features and one-hot slots straight into a
+    # float32 matrix aligned with the model's training columns.
+    with STAGE_SECONDS.time(stage='encode'):
+        return feature_encoder.transform(featured_df)
+
+def format_predictions(prediction_proba):
+    # Labels come from the same probabilities, so the model only runs once per batch.
+    predicted_labels = classes[np.argmax(prediction_proba, axis=1)]
+    return [
+        {
+            'prediction': label,
+            'confidenceScores': {
+                class_label: float(prob) for class_label, prob in zip(classes, row_proba)
+            }
+        }
+        for label, row_proba in zip(predicted_labels, prediction_proba)
+    ]
+
+def respond(payload):
+    with STAGE_SECONDS.time(stage='serialize'):
+        return jsonify(payload)
+
+def parse_batch_payload():
+    # Accept either a JSON array of supplier objects or NDJSON (one object per line).
+    json_data = request.get_json(silent=True)
+    if json_data is None:
+        body = request.get_data(as_text=True)
+        json_data = [json.loads(line) for line in body.splitlines() if line.strip()]
+    if isinstance(json_data, dict):
+        json_data = [json_data]
+    if not isinstance(json_data, list) or not all(isinstance(record, dict) for record in json_data):
+        raise ValueError('Batch payload must be a JSON array or NDJSON stream of supplier objects.')
+    return json_data
+
+# --- Input Validation ---
+# Checked per record before anything is batched, so one malformed payload can only fail its
+# own request. Flags must be present: a missing one would become NaN (i.e. True) once the
+# record shares a DataFrame with others. Numeric fields must be JSON numbers (or null).
+# Optional numeric fields that are missing or null come back as NaN, so a record encodes the
+# same on its own as in a DataFrame shared with records that do carry them.
+REQUIRED_NUMERIC_FIELDS = ['total_emissions_kg_co2e']
+NUMERIC_FIELDS = REQUIRED_NUMERIC_FIELDS + ['water_usage_m3', 'turnover_rate_percent', 'workplace_accidents_last_year', 'lat', 'lng']
+MISSING_AS_NAN_FIELDS = NUMERIC_FIELDS + ['number_of_workers']
+
+def validate_record(record):
+    if not isinstance(record, dict):
+        raise ValueError('Each supplier must be a JSON object.')
+    missing = [field for field in BOOLEAN_COLS + REQUIRED_NUMERIC_FIELDS if field not in record]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}.")
+    for field in BOOLEAN_COLS:
+        if not isinstance(record[field], bool):
+            raise ValueError(f"'{field}' must be true or false.")
+    for field in NUMERIC_FIELDS:
+        value = record.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"'{field}' must be a number.")
+    return {**record, **{field: np.nan for field in MISSING_AS_NAN_FIELDS if record.get(field) is None}}
+
+def validate_batch(records):
+    # Returns (validated records, errors). Batches are rejected as a whole, naming each bad row:
+    # in a shared DataFrame one string numeric would turn its column to object dtype and zero it
+    # for every other row.
+    validated, errors = [], []
+    for index, record in enumerate(records):
+        try:
+            validated.append(validate_record(record))
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+    return validated, errors
 
 # --- Prediction Endpoint ---
 @app.route('/predict', methods=['POST'])
@@ -64,38 +245,191 @@ def predict():
     if not model:
         return jsonify({'error': 'Model is not loaded.'}), 500
 
-    json_data = request.get_json()
+    with STAGE_SECONDS.time(stage='parse'):
+        json_data = request.get_json()
+    if not json_data:
+        return jsonify({'error': 'No input data provided.'}), 400
+    try:
+        record = validate_record(json_data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if micro_batcher:
+        try:
+            prediction_proba = micro_batcher.submit(record, timeout=PREDICT_TIMEOUT_S)[np.newaxis, :]
+        except QueueFull as e:
+            # Backpressure: shed load instead of queueing without bound.
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+        except concurrent.futures.TimeoutError:
+            return jsonify({'error': f'Prediction timed out after {PREDICT_TIMEOUT_S:g}s.'}), 504
+    else:
+        prediction_proba = predict_proba_cached(build_model_input(pd.DataFrame([record])), source='predict')
+
+    return respond(format_predictions(prediction_proba)[0])
+
+# --- Batch Prediction Endpoint ---
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    if not model:
+        return jsonify({'error': 'Model is not loaded.'}), 500
+
+    try:
+        with STAGE_SECONDS.time(stage='parse'):
+            records = parse_batch_payload()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not records:
+        return jsonify({'error': 'No input data provided.'}), 400
+    records, errors = validate_batch(records)
+    if errors:
+        return jsonify({'error': f'{len(errors)} invalid supplier record(s).', 'invalid': errors}), 400
+
+    # Score the whole batch as one matrix; results keep the input order.
+    model_input = build_model_input(pd.DataFrame(records))
+    prediction_proba = predict_proba_cached(model_input, source='batch')
+
+    return respond({'count': len(records), 'predictions': format_predictions(prediction_proba)})
+
+# --- Explanation Endpoints ---
+# Per-class top-k drivers from XGBoost's native TreeSHAP, aggregated to input fields.
+# Contributions are log-odds; positive values push the supplier towards that class.
+EXPLAIN_TOP_K = int(os.environ.get('ESG_EXPLAIN_TOP_K', 5))
+
+def explain_frame(explainer, df, top_k):
+    with STAGE_SECONDS.time(stage='features'):
+        featured_df = featurize(df)
+    with STAGE_SECONDS.time(stage='encode'):
+        model_input = feature_encoder.transform(featured_df)
+    MODEL_ROWS.observe(len(model_input), source='explain')
+    with STAGE_SECONDS.time(stage='explain'):
+        return explainer.explain(model_input, featured_df, top_k)
+
+def parse_top_k():
+    top_k = request.args.get('top_k', EXPLAIN_TOP_K, type=int)
+    if top_k is None or top_k < 1:
+        raise ValueError("'top_k' must be a positive integer.")
+    return top_k
+
+@app.route('/explain', methods=['POST'])
+def explain():
+    if not model:
+        return jsonify({'error': 'Model is not loaded.'}), 500
+    try:
+        explainer = get_explainer()
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 500
+
+    with STAGE_SECONDS.time(stage='parse'):
+        json_data = request.get_json()
     if not json_data:
         return jsonify({'error': 'No input data provided.'}), 400
+    try:
+        record = validate_record(json_data)
+        top_k = parse_top_k()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return respond(explain_frame(explainer, pd.DataFrame([record]), top_k)[0])
+
+@app.route('/explain/batch', methods=['POST'])
+def explain_batch():
+    if not model:
+        return jsonify({'error': 'Model is not loaded.'}), 500
+    try:
+        explainer = get_explainer()
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 500
+
+    try:
+        with STAGE_SECONDS.time(stage='parse'):
+            records = parse_batch_payload()
+        top_k = parse_top_k()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not records:
+        return jsonify({'error': 'No input data provided.'}), 400
+    records, errors = validate_batch(records)
+    if errors:
+        return jsonify({'error': f'{len(errors)} invalid supplier record(s).', 'invalid': errors}), 400
+
+    return respond({'count': len(records), 'explanations': explain_frame(explainer, pd.DataFrame(records), top_k)})
+
+# --- Nearby Facilities Endpoint ---
+# GET /nearby?lat=..&lng=..&radius_km=..&k=.. : facilities within radius_km, the k nearest,
+# or (with both) the k nearest within radius_km; nearest first. Defaults to k=10.
+NEARBY_MAX_RESULTS = int(os.environ.get('ESG_NEARBY_MAX_RESULTS', 1000))
+
+def parse_nearby_args():
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("'lat' and 'lng' must be valid coordinates.")
+    radius_km = request.args.get('radius_km', type=float)
+    k = request.args.get('k', type=int)
+    if radius_km is None and k is None:
+        k = 10
+    if radius_km is not None and not radius_km > 0:
+        raise ValueError("'radius_km' must be a positive number.")
+    if k is not None and not 1 <= k <= NEARBY_MAX_RESULTS:
+        raise ValueError(f"'k' must be between 1 and {NEARBY_MAX_RESULTS}.")
+    return lat, lng, radius_km, k
+
+@app.route('/nearby', methods=['GET'])
+def nearby():
+    if geo_index is None:
+        return jsonify({'error': 'Facility index is not loaded.'}), 500
+    try:
+        lat, lng, radius_km, k = parse_nearby_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    with STAGE_SECONDS.time(stage='nearby'):
+        rows, distances_km = geo_index.nearby(lat, lng, radius_km=radius_km, k=k)
+        # Radius-only queries are capped; the nearest results are kept.
+        rows, distances_km = rows[:NEARBY_MAX_RESULTS], distances_km[:NEARBY_MAX_RESULTS]
+        facilities = geo_index.describe(rows, distances_km).astype(object)
+        facilities = facilities.where(facilities.notna(), None).to_dict('records')
+    return respond({'count': len(facilities), 'facilities': facilities})
+
+# --- Cache Statistics Endpoint ---
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    if prediction_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **prediction_cache.stats()})
+
+# --- Request Instrumentation ---
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profiler = None
+    if PROFILE_ENABLED and (request.headers.get('X-Profile') == '1' or random.random() < PROFILE_SAMPLE_RATE):
+        if profile_lock.acquire(blocking=False):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    if g.get('profiler') is not None:
+        g.profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile_file = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(profile_sequence)}-{endpoint.strip('/').replace('/', '_')}.prof")
+        g.profiler.dump_stats(profile_file)
+        g.profiler = None
+        profile_lock.release()
+        response.headers['X-Profile-File'] = profile_file
+    REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    REQUEST_SECONDS.observe(time.perf_counter() - g.get('request_start', time.perf_counter()), endpoint=endpoint)
+    PAYLOAD_BYTES.observe(request.content_length or 0, endpoint=endpoint)
+    return response
 
-    new_df = pd.DataFrame([json_data])
-    featured_df = create_features(new_df)
-    
-    categorical_cols = ['country', 'industryVertical', 'processing_type', 'sector', 'industry_description']
-    encoded_df = pd.get_dummies(featured_df, columns=categorical_cols, drop_first=True)
-    
-    # FIX: Select only the numeric/boolean columns to ensure the format perfectly matches the training data.
-    # This removes original text columns like 'number_of_workers' before prediction.
-    numeric_encoded_df = encoded_df.select_dtypes(include=['number', 'bool'])
-
-    # Align columns with the model's training data
-    final_df = numeric_encoded_df.reindex(columns=model_columns, fill_value=0)
-
-    prediction_encoded = model.predict(final_df)
-    prediction_proba = model.predict_proba(final_df)
-    prediction_label = label_encoder.inverse_transform(prediction_encoded)[0]
-
-    confidence_scores = {
-        label: float(prob) for label, prob in zip(label_encoder.classes_, prediction_proba[0])
-    }
-    
-    response = {
-        'prediction': prediction_label,
-        'confidenceScores': confidence_scores 
-    }
-
-    return jsonify(response)
+# --- Metrics Endpoint ---
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 # --- Run Server ---
+# Development server only; use serve.py for production (pre-forked workers + micro-batching).
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    app.run(host='0.0.0.0', port=5001, debug=os.environ.get('FLASK_DEBUG') == '1')
@@ -0,0 +1,61 @@
+import argparse
+import io
+import time
+import numpy as np
+import pandas as pd
+from emissions import EmissionFactorRegistry, calculate_emissions
+
+# Compares emissions.calculate_emissions against step1's original apply + merge + groupby
+# on synthetic activity records (several rows per supplier), and checks both give the same
+# per-supplier totals. The activities use step1's exact unit strings, since the original
+# path cannot convert units.
+
+FACTORS = """source,unit,factor
+Grid,kg CO2e/kWh,0.82
+Natural Gas,kg CO2e/m³,2.02
+Diesel Fuel,kg CO2e/Liter,2.68
+"""
+ACTIVITIES = [('Electricity', 'kWh'), ('Natural Gas', 'm³'), ('Diesel Fuel', 'Liters')]
+
+
+def make_activities(n, rows_per_supplier=5, seed=42):
+    rng = np.random.default_rng(seed)
+    kinds = rng.integers(0, len(ACTIVITIES), n)
+    return pd.DataFrame({
+        'supplierId': [f'sup_{i:07d}' for i in rng.integers(0, max(1, n // rows_per_supplier), n)],
+        'dataType': np.array([a for a, _ in ACTIVITIES], dtype=object)[kinds],
+        'value': rng.uniform(0, 250000, n),
+        'unit': np.array([u for _, u in ACTIVITIES], dtype=object)[kinds],
+    })
+
+
+# --- Original implementation (step1 before emissions.py) ---
+def legacy_emissions(activity_df, factors_df):
+    activity_df['source'] = activity_df['dataType'].apply(lambda x: 'Grid' if 'Electric' in x else x)
+    emissions_df = pd.merge(activity_df, factors_df, on='source', how='left')
+    emissions_df['total_emissions_kg_co2e'] = emissions_df['value'] * emissions_df['factor']
+    return emissions_df.groupby('supplierId')['total_emissions_kg_co2e'].sum().reset_index()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark merge + apply vs vectorized emissions totals.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 5_000_000])
+    args = parser.parse_args()
+
+    factors_df = pd.read_csv(io.StringIO(FACTORS))
+    registry = EmissionFactorRegistry.from_frame(factors_df)
+    print(f"{'activities':>11} {'merge+apply (s)':>16} {'vectorized (s)':>15} {'speedup':>8}")
+    for n in args.sizes:
+        activity_df = make_activities(n)
+        legacy, legacy_time = timed(legacy_emissions, activity_df.copy(), factors_df)
+        fast, fast_time = timed(calculate_emissions, activity_df, registry)
+        if not (legacy['supplierId'].to_numpy() == fast['supplierId'].to_numpy()).all() or not np.allclose(
+                legacy['total_emissions_kg_co2e'], fast['total_emissions_kg_co2e'], rtol=1e-9):
+            raise AssertionError(f"Per-supplier totals differ between the two paths at {n} activities.")
+        print(f"{n:>11,} {legacy_time:>16.3f} {fast_time:>15.3f} {legacy_time / fast_time:>7.0f}x")
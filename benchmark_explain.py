@@ -0,0 +1,68 @@
+import argparse
+import os
+import time
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from explainer import Explainer
+from feature_encoder import FeatureEncoder
+from features import create_features
+
+# Latency of /explain's TreeSHAP path against /predict's predict_proba at several batch
+# sizes, both starting from raw supplier records (create_features + encode included).
+# Also checks the explainer's probabilities match predict_proba and that the field
+# contributions plus bias add back up to the class margins.
+
+warnings.filterwarnings('ignore')
+
+
+def median_seconds(func, repeats):
+    func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return np.median(timings)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark /explain (TreeSHAP) against /predict latency.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 10_000])
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--top-k', type=int, default=5)
+    args = parser.parse_args()
+
+    model = joblib.load('esg_risk_model.pkl')
+    label_encoder = joblib.load('label_encoder.pkl')
+    try:
+        encoder = joblib.load('feature_encoder.pkl')
+    except FileNotFoundError:
+        encoder = FeatureEncoder(joblib.load('model_columns.pkl'))
+    explainer = Explainer(model.get_booster(), encoder, label_encoder.classes_)
+    source = pd.read_csv('featured_dataset.csv')
+
+    X = encoder.transform(create_features(source.copy()))
+    by_field, bias, proba = explainer.contributions(X)
+    margin = model.predict(pd.DataFrame(X, columns=encoder.columns), output_margin=True)
+    print(f"Max |p - predict_proba|: {np.abs(proba - model.predict_proba(pd.DataFrame(X, columns=encoder.columns))).max():.1e}, "
+          f"max |sum(contributions) - margin|: {np.abs(by_field.sum(axis=2) + bias - margin.reshape(bias.shape)).max():.1e}\n")
+
+    def predict(df):
+        featured = create_features(df.copy())
+        return model.predict_proba(pd.DataFrame(encoder.transform(featured), columns=encoder.columns))
+
+    def explain(df):
+        featured = create_features(df.copy())
+        return explainer.explain(encoder.transform(featured), featured, args.top_k)
+
+    print(f"{os.cpu_count()} CPU cores, xgboost {xgb.__version__}, pandas {pd.__version__}")
+    print(f"{'rows':>8} {'predict (ms)':>14} {'explain (ms)':>14} {'ratio':>7}")
+    for n in args.sizes:
+        df = source.sample(n, replace=True, random_state=42).reset_index(drop=True)
+        repeats = max(3, args.repeats if n < 10_000 else args.repeats // 4)
+        predict_time = median_seconds(lambda: predict(df), repeats)
+        explain_time = median_seconds(lambda: explain(df), repeats)
+        print(f"{n:>8,} {predict_time * 1e3:>14.2f} {explain_time * 1e3:>14.2f} {explain_time / predict_time:>6.1f}x")
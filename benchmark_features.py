@@ -0,0 +1,106 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from features import GEOPOLITICAL_RISK, INDUSTRY_RISK, add_environmental_features, assign_risk_level
+
+# Compares the vectorized features.py against the original row-wise step2 logic
+# on synthetic supplier frames, and checks both produce the same columns.
+
+COUNTRIES = list(GEOPOLITICAL_RISK) + ['Germany', 'Italy']
+VERTICALS = ['Garment Manufacturing', 'Dyeing & Finishing', 'Spinning Mill', 'Raw Material Farming',
+             'Weaving & Knitting', 'Packaging', 'Logistics', 'Printing', 'Manufacturing']
+PROCESSING_TYPES = ['Unspecified', 'Dyeing|Finishing', 'Weaving', 'Printing', 'Cut & Sew', 'Farming']
+WORKER_BANDS = ['0', '1-50', '51-200', '201-500', '501-1000', '1001-5000', '5001+', 'Unknown']
+
+
+def make_suppliers(n, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'country': rng.choice(COUNTRIES, n),
+        'industryVertical': rng.choice(VERTICALS, n),
+        'processing_type': rng.choice(PROCESSING_TYPES, n),
+        'number_of_workers': rng.choice(WORKER_BANDS, n),
+        'total_emissions_kg_co2e': rng.uniform(0, 500000, n),
+        'water_usage_m3': rng.integers(1000, 300000, n),
+        'turnover_rate_percent': rng.integers(0, 40, n),
+        'workplace_accidents_last_year': rng.integers(0, 15, n),
+        'has_anti_corruption_policy': rng.random(n) < 0.5,
+        'publishes_esg_report': rng.random(n) < 0.5,
+        'is_iso14001_certified': rng.random(n) < 0.5,
+        'is_sa8000_certified': rng.random(n) < 0.5,
+    })
+
+
+# --- Original row-wise implementation (step2 before features.py) ---
+def legacy_features(df):
+    df['geopolitical_risk'] = df['country'].map(GEOPOLITICAL_RISK).fillna(3)
+    df['industry_description'] = df.apply(
+        lambda row: row['processing_type'] if pd.notna(row['processing_type']) and row['processing_type'] != 'Unspecified' else row['industryVertical'],
+        axis=1
+    )
+    def map_industry_risk(desc):
+        for risk_word, score in INDUSTRY_RISK.items():
+            if risk_word.lower() in str(desc).lower(): return score
+        return 2
+    df['industry_risk'] = df['industry_description'].apply(map_industry_risk)
+
+    def parse_workers(worker_str):
+        worker_str = str(worker_str)
+        if '5001+' in worker_str: return 7500
+        if '-' in worker_str:
+            try:
+                low, high = map(int, worker_str.split('-'))
+                return (low + high) / 2
+            except: return 0
+        return 0
+    df['worker_count_avg'] = df['number_of_workers'].apply(parse_workers)
+    df['emission_intensity'] = df.apply(
+        lambda row: row['total_emissions_kg_co2e'] / row['worker_count_avg'] if row['worker_count_avg'] > 0 else 0,
+        axis=1
+    )
+
+    def assign_risk_level(row):
+        score = 0
+        score += row['geopolitical_risk'] + row['industry_risk']
+        if row['total_emissions_kg_co2e'] > 80000: score += 2
+        if row['water_usage_m3'] > 100000: score += 1
+        if row['is_iso14001_certified']: score -= 2
+        if row['turnover_rate_percent'] > 20: score += 1
+        if row['workplace_accidents_last_year'] > 5: score += 2
+        if row['is_sa8000_certified']: score -= 3
+        if not row['has_anti_corruption_policy']: score += 2
+        if not row['publishes_esg_report']: score += 1
+        if score >= 9: return 'High'
+        if score >= 5: return 'Medium'
+        return 'Low'
+    df['risk_level'] = df.apply(assign_risk_level, axis=1)
+    return df
+
+
+def vectorized_features(df):
+    add_environmental_features(df, unspecified_is_missing=True)
+    df['risk_level'] = assign_risk_level(df)
+    return df
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df.copy())
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark row-wise vs vectorized feature engineering.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'row-wise (s)':>14} {'vectorized (s)':>16} {'speedup':>9}")
+    for n in args.sizes:
+        df = make_suppliers(n)
+        legacy, legacy_time = timed(legacy_features, df)
+        fast, fast_time = timed(vectorized_features, df)
+        for col in ['geopolitical_risk', 'industry_description', 'industry_risk', 'worker_count_avg', 'emission_intensity', 'risk_level']:
+            if not np.array_equal(legacy[col].to_numpy(), fast[col].to_numpy()):
+                raise AssertionError(f"Column '{col}' differs between row-wise and vectorized output at {n} rows.")
+        print(f"{n:>10,} {legacy_time:>14.3f} {fast_time:>16.3f} {legacy_time / fast_time:>8.0f}x")
@@ -0,0 +1,78 @@
+import argparse
+import time
+import numpy as np
+from facility_geo import FacilityGeoIndex, DEFAULT_RADIUS_KM, km_to_chord, to_unit_vectors
+
+# Build time, single-query latency (radius and k-nearest) and bulk proximity-feature time
+# for the facility spatial index on synthetic facilities clustered around textile hubs.
+# A brute-force haversine pass over a sample of points checks radius queries are exact;
+# the grid-approximated density counts are compared with exact tree counts on a sample.
+
+HUBS = [(23.81, 90.41), (22.36, 91.78), (11.02, 76.96), (21.17, 72.83), (31.52, 74.36), (24.86, 67.01),
+        (10.82, 106.63), (41.01, 28.98), (30.27, 120.15), (23.13, 113.26), (-23.55, -46.63), (33.57, -7.59)]
+DESCRIPTIONS = ['Dyeing|Finishing', 'Printing', 'Spinning', 'Weaving', 'Cut & Sew', 'Apparel', 'Packaging']
+
+
+def make_facilities(n, seed=42):
+    rng = np.random.default_rng(seed)
+    hubs = np.array(HUBS)[rng.integers(0, len(HUBS), n)]
+    # Most facilities sit within a few tens of km of a hub; the rest are scattered.
+    spread = np.where(rng.random(n) < 0.9, 0.3, 5.0)[:, np.newaxis]
+    points = hubs + rng.normal(0, 1, (n, 2)) * spread
+    return np.clip(points[:, 0], -90, 90), (points[:, 1] + 180) % 360 - 180, rng.choice(DESCRIPTIONS, n)
+
+
+def haversine_km(lat, lng, lats, lngs):
+    lat, lng, lats, lngs = map(np.radians, (lat, lng, lats, lngs))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2
+    return 2 * 6371.0088 * np.arcsin(np.sqrt(a))
+
+
+def latency_us(query, points, repeats):
+    timings = []
+    for i in range(repeats):
+        lat, lng = points[i % len(points)]
+        start = time.perf_counter()
+        query(lat, lng)
+        timings.append(time.perf_counter() - start)
+    return np.percentile(timings, 50) * 1e6, np.percentile(timings, 99) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the facility spatial index.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--radius-km', type=float, default=DEFAULT_RADIUS_KM)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'facilities':>11} {'build (s)':>10} {'radius p50/p99 (us)':>20} {'knn p50/p99 (us)':>17} "
+          f"{'bulk features (s)':>18} {'count err mean/max (%)':>23}")
+    for n in args.sizes:
+        lat, lng, descriptions = make_facilities(n)
+        start = time.perf_counter()
+        geo_index = FacilityGeoIndex(lat, lng, descriptions)
+        build_time = time.perf_counter() - start
+
+        queries = np.column_stack([lat, lng])[np.random.default_rng(0).integers(0, n, 100)]
+        for q_lat, q_lng in queries[:10]:
+            rows, distances = geo_index.nearby(q_lat, q_lng, radius_km=args.radius_km)
+            distances_km = haversine_km(q_lat, q_lng, lat, lng)
+            exact = set(np.flatnonzero(distances_km <= args.radius_km).tolist())
+            borderline = set(np.flatnonzero(np.abs(distances_km - args.radius_km) < 1e-6).tolist())
+            if (set(rows.tolist()) ^ exact) - borderline or not np.allclose(distances_km[rows], distances, atol=1e-6):
+                raise AssertionError(f"Radius query differs from brute-force haversine at {n} facilities.")
+
+        radius = latency_us(lambda a, b: geo_index.nearby(a, b, radius_km=args.radius_km), queries, args.repeats)
+        knn = latency_us(lambda a, b: geo_index.nearby(a, b, k=args.k), queries, args.repeats)
+        start = time.perf_counter()
+        features = geo_index.proximity_features(lat, lng, args.radius_km)
+        bulk_time = time.perf_counter() - start
+
+        sample = np.random.default_rng(1).integers(0, n, 2000)
+        exact_counts = geo_index.tree.query_ball_point(
+            to_unit_vectors(lat[sample], lng[sample]), km_to_chord(args.radius_km), return_length=True)
+        counts = features['facility_density'].to_numpy()[sample] * np.pi * args.radius_km ** 2 / 1000
+        count_err = np.abs(counts - exact_counts) / exact_counts * 100
+        print(f"{n:>11,} {build_time:>10.2f} {radius[0]:>10.0f}/{radius[1]:<9.0f} {knn[0]:>8.0f}/{knn[1]:<8.0f} "
+              f"{bulk_time:>18.2f} {count_err.mean():>11.2f}/{count_err.max():<11.2f}")
@@ -0,0 +1,88 @@
+import argparse
+import subprocess
+import sys
+import time
+import warnings
+import numpy as np
+
+# Cold start and single-row latency of the three inference paths:
+#   sklearn:  joblib-pickled XGBClassifier (pandas + sklearn + xgboost imported)
+#   booster:  native esg_risk_model.ubj loaded into xgboost.Booster, inplace_predict on NumPy
+#   compiled: fast_inference.CompiledModel (NumPy only)
+# Cold start runs each path in a fresh interpreter: imports, artifact load and first prediction.
+
+warnings.filterwarnings('ignore')
+
+COLD_START = {
+    'sklearn': """
+import joblib, numpy as np, pandas as pd
+model = joblib.load('esg_risk_model.pkl')
+columns = joblib.load('model_columns.pkl')
+model.predict_proba(pd.DataFrame(np.zeros((1, len(columns)), dtype=np.float32), columns=columns))
+""",
+    'booster': """
+import numpy as np, xgboost as xgb
+booster = xgb.Booster(model_file='esg_risk_model.ubj')
+booster.inplace_predict(np.zeros((1, booster.num_features()), dtype=np.float32))
+""",
+    'compiled': """
+import numpy as np
+from fast_inference import CompiledModel
+model = CompiledModel.load()
+model.predict_proba(np.zeros((1, len(model.columns)), dtype=np.float32))
+""",
+}
+
+
+def cold_start(code, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-W', 'ignore', '-c', code], check=True)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def latency_us(predict, X, repeats):
+    predict(X[:1])
+    timings = []
+    for i in range(repeats):
+        row = X[i % len(X):i % len(X) + 1]
+        start = time.perf_counter()
+        predict(row)
+        timings.append(time.perf_counter() - start)
+    return np.percentile(timings, 50) * 1e6, np.percentile(timings, 99) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark cold start and single-row latency of the inference paths.")
+    parser.add_argument('--cold-repeats', type=int, default=3)
+    parser.add_argument('--latency-repeats', type=int, default=2000)
+    args = parser.parse_args()
+
+    import joblib
+    import pandas as pd
+    import xgboost as xgb
+    from fast_inference import CompiledModel
+    from feature_encoder import FeatureEncoder
+
+    model = joblib.load('esg_risk_model.pkl')
+    columns = joblib.load('model_columns.pkl')
+    X = FeatureEncoder(columns).transform(pd.read_csv('featured_dataset.csv'))
+    X_df = pd.DataFrame(X, columns=columns)
+    booster = xgb.Booster(model_file='esg_risk_model.ubj')
+    compiled = CompiledModel.load()
+
+    paths = {
+        'sklearn': lambda row: model.predict_proba(pd.DataFrame(row, columns=columns)),
+        'booster': lambda row: booster.inplace_predict(row),
+        'compiled': lambda row: compiled.predict_proba(row),
+    }
+    reference = model.predict_proba(X_df)
+    print(f"Max |p - p_sklearn|: booster {np.abs(booster.inplace_predict(X) - reference).max():.1e}, "
+          f"compiled {np.abs(compiled.predict_proba(X) - reference).max():.1e}\n")
+
+    print(f"{'path':>10} {'cold start (s)':>16} {'p50 (us)':>10} {'p99 (us)':>10}")
+    for name, predict in paths.items():
+        p50, p99 = latency_us(predict, X, args.latency_repeats)
+        print(f"{name:>10} {cold_start(COLD_START[name], args.cold_repeats):>16.2f} {p50:>10.0f} {p99:>10.0f}")
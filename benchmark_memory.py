@@ -0,0 +1,60 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from benchmark_features import make_suppliers
+from benchmark_pipeline import make_facilities
+from features import add_environmental_features, assign_risk_level
+from table_schema import FACILITY_SCHEMA, SUPPLIER_SCHEMA, load_table, memory_mb
+
+# In-memory size and load time of the facility and supplier tables with pandas' default
+# dtypes vs the explicit dtypes in table_schema.py: the real facilities-2.csv, plus
+# synthetic facility and featured supplier files of --rows rows each.
+
+
+def make_featured_suppliers(n):
+    df = make_suppliers(n)
+    df.insert(0, 'supplierId', pd.Series(np.arange(n)).astype(str).radd('sup_'))
+    df.insert(1, 'name', pd.Series(np.arange(n)).astype(str).radd('Supplier '))
+    df['sector'] = 'Apparel'
+    add_environmental_features(df, unspecified_is_missing=True)
+    df['risk_level'] = assign_risk_level(df)
+    return df
+
+
+def timed_load(load):
+    start = time.perf_counter()
+    df = load()
+    return df, time.perf_counter() - start
+
+
+def report(label, path, schema):
+    default_df, default_time = timed_load(lambda: pd.read_csv(path))
+    typed_df, typed_time = timed_load(lambda: load_table(path, schema))
+    if len(default_df) != len(typed_df) or list(default_df.columns) != list(typed_df.columns):
+        raise AssertionError(f"Typed load of '{path}' does not have the same shape as the default load.")
+    default_mb, typed_mb = memory_mb(default_df), memory_mb(typed_df)
+    print(f"{label:>28} {len(typed_df):>10,} {default_mb:>13.1f} {typed_mb:>11.1f} {1 - typed_mb / default_mb:>10.0%} "
+          f"{default_time:>9.2f} {typed_time:>9.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report memory saved by the typed table schemas.")
+    parser.add_argument('--facilities', default='facilities-2.csv')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'table':>28} {'rows':>10} {'default (MB)':>13} {'typed (MB)':>11} {'reduction':>10} {'load (s)':>9} {'typed (s)':>9}")
+    if os.path.exists(args.facilities):
+        report(args.facilities, args.facilities, FACILITY_SCHEMA)
+    with tempfile.TemporaryDirectory(prefix='esg_memory_') as workdir:
+        facilities_file = os.path.join(workdir, 'facilities.csv')
+        make_facilities(args.rows).to_csv(facilities_file, index=False)
+        report('synthetic facilities', facilities_file, FACILITY_SCHEMA)
+        os.remove(facilities_file)
+
+        suppliers_file = os.path.join(workdir, 'suppliers.csv')
+        make_featured_suppliers(args.rows).to_csv(suppliers_file, index=False)
+        report('synthetic featured suppliers', suppliers_file, SUPPLIER_SCHEMA)
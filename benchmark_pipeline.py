@@ -0,0 +1,380 @@
+import argparse
+import gc
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder
+from benchmark_features import COUNTRIES, VERTICALS, PROCESSING_TYPES, WORKER_BANDS
+from facility_geo import FacilityGeoIndex, add_proximity_features
+from facility_store import FacilityStore, build_cache
+from feature_encoder import FeatureEncoder, CATEGORICAL_COLS
+from features import BOOLEAN_COLS, add_environmental_features, assign_risk_level, create_features, fill_supplier_defaults
+from scoring import ScoringArtifacts, score_frame
+from supplier_matcher import resolve_facility_rows
+
+# End-to-end benchmark and regression guard. For each scale it generates synthetic
+# facilities (facilities-2.csv schema) and suppliers (step1 schema, most of them named
+# after a facility) in a scratch directory, then times each pipeline stage and records
+# its peak resident memory:
+#   ingest           facilities CSV -> memory-mapped cache (facility_store.build_cache)
+#   enrichment       exact (name, country) lookups + facility columns (step1)
+#   featurization    step2's features, proximity features and risk labels
+#   training         step3's one-hot encoding and XGBoost fit
+#   api_startup      `python -c "import api"` in a fresh interpreter: the real cold start, i.e.
+#                    library imports plus model, encoder, explainer and spatial index load
+#   predict_single   /predict's path (features, encoder, predict_proba) one row at a time
+#   predict_batch    scoring.score_frame over the whole frame
+#   endpoint_single  POST /predict through Flask's test client
+#   endpoint_batch   POST /predict/batch through Flask's test client
+# Results go to a JSON file; with --baseline, any stage slower (or, above a small floor,
+# hungrier) than the baseline by more than the threshold fails the run with exit code 1.
+
+warnings.filterwarnings('ignore')
+
+STAGES = ['ingest', 'enrichment', 'featurization', 'training', 'api_startup',
+          'predict_single', 'predict_batch', 'endpoint_single', 'endpoint_batch']
+DEFAULT_RESULTS_FILE = 'benchmark_results.json'
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Rough facility clusters per country, so the spatial index sees realistic density.
+COUNTRY_CENTRES = {'India': (21.0, 78.0), 'China': (30.0, 115.0), 'Vietnam': (14.0, 107.0), 'Bangladesh': (23.7, 90.4),
+                   'USA': (37.0, -95.0), 'Turkey': (39.0, 35.0), 'Pakistan': (30.0, 70.0), 'Brazil': (-15.0, -50.0),
+                   'Morocco': (32.0, -6.0), 'Germany': (51.0, 10.0), 'Italy': (43.0, 12.0)}
+COUNTRY_CODES = {'India': 'IN', 'China': 'CN', 'Vietnam': 'VN', 'Bangladesh': 'BD', 'USA': 'US', 'Turkey': 'TR',
+                 'Pakistan': 'PK', 'Brazil': 'BR', 'Morocco': 'MA', 'Germany': 'DE', 'Italy': 'IT'}
+SECTORS = ['Apparel', 'Textiles', 'Footwear', 'Apparel|Textiles', 'Home Textiles']
+NAME_WORDS = np.array(['Apex', 'Star', 'Global', 'Textile', 'Cotton', 'Weaving', 'Dye', 'Knit', 'Fabric', 'Mills',
+                       'Garments', 'Exports', 'Spinning', 'Denim', 'Prints', 'Fashion', 'Tex', 'Silk', 'Thread', 'Loom'])
+FACILITY_COLUMNS = ['os_id', 'contribution_date', 'name', 'address', 'country_code', 'country_name', 'lat', 'lng', 'sector',
+                    'contributor (list)', 'number_of_workers', 'parent_company', 'processing_type_facility_type_raw',
+                    'facility_type', 'processing_type', 'product_type', 'is_closed']
+
+
+# --- Synthetic data ---
+def make_facilities(n, seed=42):
+    rng = np.random.default_rng(seed)
+    country_idx = rng.integers(0, len(COUNTRY_CENTRES), n)
+    countries = np.array(list(COUNTRY_CENTRES))[country_idx]
+    points = np.array(list(COUNTRY_CENTRES.values()))[country_idx] + rng.normal(0, 2.0, (n, 2))
+    words = NAME_WORDS[rng.integers(0, len(NAME_WORDS), (n, 2))]
+    # The row number keeps every (name, country) key unique.
+    names = pd.Series(words[:, 0]) + ' ' + pd.Series(words[:, 1]) + ' ' + pd.Series(np.arange(n)).astype(str)
+    processing_types = rng.choice(PROCESSING_TYPES + [''], n)
+    return pd.DataFrame({
+        'os_id': pd.Series(np.arange(n)).astype(str).radd('SY'),
+        'contribution_date': '2023-01-01',
+        'name': names,
+        'address': '',
+        'country_code': pd.Series(countries).map(COUNTRY_CODES),
+        'country_name': countries,
+        'lat': np.clip(points[:, 0], -90, 90),
+        'lng': points[:, 1],
+        'sector': rng.choice(SECTORS, n),
+        'contributor (list)': 'A Brand/Retailer',
+        'number_of_workers': rng.choice(WORKER_BANDS + [''], n),
+        'parent_company': '',
+        'processing_type_facility_type_raw': processing_types,
+        'facility_type': '',
+        'processing_type': processing_types,
+        'product_type': '',
+        'is_closed': 'False',
+    }, columns=FACILITY_COLUMNS)
+
+
+def make_suppliers(n, facilities_df, matched_fraction=0.7, seed=7):
+    # Internal supplier records (step1 schema before enrichment); matched_fraction of them are facilities.
+    rng = np.random.default_rng(seed)
+    matched = rng.random(n) < matched_fraction
+    facility_rows = rng.integers(0, len(facilities_df), n)
+    names = np.where(matched, facilities_df['name'].to_numpy()[facility_rows], pd.Series(np.arange(n)).astype(str).radd('Unlisted Supplier ').to_numpy())
+    countries = np.where(matched, facilities_df['country_name'].to_numpy()[facility_rows], rng.choice(COUNTRIES, n))
+    return pd.DataFrame({
+        'supplierId': pd.Series(np.arange(n)).astype(str).radd('sup_'),
+        'name': names,
+        'country': countries,
+        'industryVertical': rng.choice(VERTICALS, n),
+        'water_usage_m3': rng.integers(1000, 300000, n),
+        'turnover_rate_percent': rng.integers(0, 40, n),
+        'workplace_accidents_last_year': rng.integers(0, 15, n),
+        'has_anti_corruption_policy': rng.random(n) < 0.5,
+        'publishes_esg_report': rng.random(n) < 0.5,
+        'total_emissions_kg_co2e': rng.uniform(0, 500000, n),
+    })
+
+
+# --- Measurement ---
+class PeakRSS:
+    # Samples this process's resident set size in a background thread; peak_mb is the growth
+    # over the value at entry. Covers native allocations (XGBoost, NumPy) that tracemalloc misses.
+    # Linux only (/proc); elsewhere peak_mb is None.
+    def __init__(self, interval_s=0.005):
+        self.interval_s = interval_s
+        self.page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+        self.peak_mb = None
+
+    def _rss(self):
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * self.page_size
+
+    def _sample(self):
+        while not self._stop.wait(self.interval_s):
+            self._peak = max(self._peak, self._rss())
+
+    def __enter__(self):
+        if not os.path.exists('/proc/self/statm'):
+            return self
+        self._start = self._peak = self._rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if hasattr(self, '_thread'):
+            self._stop.set()
+            self._thread.join()
+            self._peak = max(self._peak, self._rss())
+            self.peak_mb = (self._peak - self._start) / 2 ** 20
+        return False
+
+
+def measure(results, stage, rows, func):
+    gc.collect()
+    with PeakRSS() as memory:
+        start = time.perf_counter()
+        output = func()
+        seconds = time.perf_counter() - start
+    results[stage] = {'seconds': seconds, 'rows': rows, 'rows_per_s': rows / seconds if seconds else None,
+                      'peak_mb': memory.peak_mb}
+    return output
+
+
+def cold_start_api(workdir):
+    # Imports api.py in a new interpreter (nothing already imported or cached) and returns its
+    # peak resident memory in MB, or None where the resource module is unavailable.
+    code = ("import api\n"
+            "try:\n"
+            "    import resource\n"
+            "    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+            "except ImportError:\n"
+            "    pass\n")
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')]))}
+    output = subprocess.run([sys.executable, '-c', code], cwd=workdir, env=env, check=True,
+                            capture_output=True, text=True).stdout.split()
+    # ru_maxrss is in KB on Linux.
+    return int(output[-1]) / 1024 if output and output[-1].isdigit() else None
+
+
+def api_records(df):
+    # JSON-native records (NumPy scalars and NaN become plain values and null), as a client would send.
+    return json.loads(df.to_json(orient='records'))
+
+
+# --- Stages ---
+def train(featured_df, n_estimators):
+    # step3's encoding and classifier; returns what api.py and scoring.py load.
+    model_df = pd.get_dummies(featured_df, columns=CATEGORICAL_COLS, drop_first=True)
+    X = model_df.select_dtypes(include=['number', 'bool']).drop(columns=['lat', 'lng'], errors='ignore')
+    le = LabelEncoder().fit(['Low', 'Medium', 'High'])
+    model = xgb.XGBClassifier(objective='multi:softprob', num_class=len(le.classes_), n_estimators=n_estimators,
+                              learning_rate=0.1, eval_metric='mlogloss', random_state=42)
+    model.fit(X, le.transform(featured_df['risk_level']))
+    return model, le, FeatureEncoder(X.columns)
+
+
+def predict_single(records, model, encoder, geo_index):
+    timings = []
+    for record in records:
+        start = time.perf_counter()
+        featured_df = add_proximity_features(create_features(pd.DataFrame([record])), geo_index)
+        model.predict_proba(encoder.transform(featured_df.to_dict('records')))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_scale(n, args, workdir):
+    results = {}
+    rng = np.random.default_rng(0)
+    facilities_df = make_facilities(n)
+    suppliers_df = make_suppliers(n, facilities_df)
+    facilities_df.to_csv(os.path.join(workdir, 'facilities-2.csv'), index=False)
+    del facilities_df
+    cache_dir = os.path.join(workdir, 'facilities_cache')
+    stages = set(args.stages)
+
+    # Later stages need the earlier ones' outputs, so those always run; only the selected ones are reported.
+    skipped = {}
+    measure(results if 'ingest' in stages else skipped, 'ingest', n,
+            lambda: build_cache(os.path.join(workdir, 'facilities-2.csv'), cache_dir))
+    store = FacilityStore(cache_dir)
+
+    def enrich():
+        facility_rows, _, _ = resolve_facility_rows(store, suppliers_df)
+        return store.enrich(suppliers_df, rows=facility_rows)
+    master_df = measure(results if 'enrichment' in stages else skipped, 'enrichment', n, enrich)
+
+    def featurize():
+        df = fill_supplier_defaults(master_df.copy())
+        add_environmental_features(df, unspecified_is_missing=True)
+        add_proximity_features(df, FacilityGeoIndex.from_store(store))
+        for col in ['is_iso14001_certified', 'is_sa8000_certified']:
+            df[col] = rng.random(len(df)) < 0.5
+        df['risk_level'] = assign_risk_level(df)
+        return df
+    featured_df = measure(results if 'featurization' in stages else skipped, 'featurization', n, featurize)
+
+    needs_model = stages & {'training', 'api_startup', 'predict_single', 'predict_batch', 'endpoint_single', 'endpoint_batch'}
+    if not needs_model:
+        return results
+    train_df = featured_df if not args.train_rows else featured_df.sample(min(args.train_rows, n), random_state=42)
+    model, le, encoder = measure(results if 'training' in stages else skipped, 'training', len(train_df),
+                                 lambda: train(train_df, args.n_estimators))
+
+    geo_index = FacilityGeoIndex.from_store(store)
+    supplier_df = master_df.assign(**{col: featured_df[col] for col in BOOLEAN_COLS})
+    single_records = api_records(supplier_df.head(args.single_rows))
+    if 'predict_single' in stages:
+        timings = measure(results, 'predict_single', len(single_records),
+                          lambda: predict_single(single_records, model, encoder, geo_index))
+        results['predict_single'].update({'p50_ms': np.percentile(timings, 50) * 1e3, 'p99_ms': np.percentile(timings, 99) * 1e3})
+    if 'predict_batch' in stages:
+        artifacts = ScoringArtifacts(model, le, encoder, geo_index)
+        measure(results, 'predict_batch', n, lambda: score_frame(supplier_df, artifacts))
+
+    if not stages & {'api_startup', 'endpoint_single', 'endpoint_batch'}:
+        return results
+    joblib.dump(model, os.path.join(workdir, 'esg_risk_model.pkl'))
+    joblib.dump(encoder.columns, os.path.join(workdir, 'model_columns.pkl'))
+    joblib.dump(le, os.path.join(workdir, 'label_encoder.pkl'))
+    joblib.dump(encoder, os.path.join(workdir, 'feature_encoder.pkl'))
+    # api.py loads its artifacts from the working directory at import; the prediction cache is
+    # disabled so repeated payloads are really scored.
+    os.environ['ESG_CACHE_SIZE'] = '0'
+    if 'api_startup' in stages:
+        # Timed in a subprocess: an in-process import reuses NumPy, pandas and XGBoost already
+        # loaded by the stages above, which hides most of a real worker's startup. peak_mb is
+        # the child's whole peak RSS rather than growth over this process.
+        peak_mb = measure(results, 'api_startup', 1, lambda: cold_start_api(workdir))
+        results['api_startup']['peak_mb'] = peak_mb
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        api = importlib.reload(sys.modules['api']) if 'api' in sys.modules else importlib.import_module('api')
+        client = api.app.test_client()
+        if 'endpoint_single' in stages:
+            def post_each():
+                for record in single_records:
+                    assert client.post('/predict', json=record).status_code == 200
+            measure(results, 'endpoint_single', len(single_records), post_each)
+        if 'endpoint_batch' in stages:
+            batch_records = api_records(supplier_df.head(args.endpoint_rows))
+            def post_batches():
+                for i in range(0, len(batch_records), args.batch_size):
+                    assert client.post('/predict/batch', json=batch_records[i:i + args.batch_size]).status_code == 200
+            measure(results, 'endpoint_batch', len(batch_records), post_batches)
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+# --- Results and comparison ---
+def scale_label(n):
+    for unit, size in (('M', 1_000_000), ('k', 1_000)):
+        if n >= size and n % size == 0:
+            return f'{n // size}{unit}'
+    return str(n)
+
+
+def environment():
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'xgboost': xgb.__version__,
+    }
+
+
+def compare(current, baseline, threshold, memory_threshold, memory_floor_mb):
+    # Returns the regressions; a stage regresses when its time (or, above memory_floor_mb, its
+    # peak memory) exceeds the baseline by more than the given fraction.
+    regressions = []
+    print(f"{'scale':>6} {'stage':>16} {'baseline (s)':>13} {'current (s)':>12} {'time':>8} {'memory':>8}  status")
+    for scale, stages in current['results'].items():
+        for stage, result in stages.items():
+            base = baseline.get('results', {}).get(scale, {}).get(stage)
+            if not base:
+                continue
+            time_change = result['seconds'] / base['seconds'] - 1
+            memory_change = None
+            if result.get('peak_mb') is not None and base.get('peak_mb') is not None and base['peak_mb'] >= memory_floor_mb:
+                memory_change = result['peak_mb'] / base['peak_mb'] - 1
+            failed = [kind for kind, change, limit in (('time', time_change, threshold), ('memory', memory_change, memory_threshold))
+                      if change is not None and change > limit]
+            if failed:
+                regressions.append({'scale': scale, 'stage': stage, 'regressed': failed,
+                                    'time_change': time_change, 'memory_change': memory_change})
+            memory_text = f"{memory_change:+.0%}" if memory_change is not None else '-'
+            print(f"{scale:>6} {stage:>16} {base['seconds']:>13.3f} {result['seconds']:>12.3f} {time_change:>+8.0%} "
+                  f"{memory_text:>8}  {'REGRESSED (' + ', '.join(failed) + ')' if failed else 'ok'}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage and guard against regressions.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--output', default=DEFAULT_RESULTS_FILE, help="Where to write this run's results.")
+    parser.add_argument('--results', help="Compare an existing results file instead of running the benchmark.")
+    parser.add_argument('--baseline', help="Results file to compare against; regressions exit with status 1.")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown per stage (0.2 = 20%%).")
+    parser.add_argument('--memory-threshold', type=float, default=0.25, help="Allowed peak memory growth per stage.")
+    parser.add_argument('--memory-floor-mb', type=float, default=32,
+                        help="Stages whose baseline peak is below this are not memory-checked (too noisy).")
+    parser.add_argument('--n-estimators', type=int, default=150, help="Boosting rounds for the training stage (step3 uses 150).")
+    parser.add_argument('--train-rows', type=int, help="Cap on training rows per scale (default: all).")
+    parser.add_argument('--single-rows', type=int, default=500, help="Rows sent one at a time in the single-row stages.")
+    parser.add_argument('--endpoint-rows', type=int, default=100_000, help="Rows sent to /predict/batch per scale.")
+    parser.add_argument('--batch-size', type=int, default=1_000, help="Rows per /predict/batch request.")
+    args = parser.parse_args()
+
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        current = {'environment': environment(), 'results': {}}
+        for n in args.sizes:
+            print(f"--- {n:,} suppliers / facilities ---")
+            with tempfile.TemporaryDirectory(prefix='esg_bench_') as workdir:
+                results = run_scale(n, args, workdir)
+            current['results'][scale_label(n)] = results
+            for stage, result in results.items():
+                memory = f"{result['peak_mb']:.0f} MB" if result['peak_mb'] is not None else 'n/a'
+                rate = f"{result['rows_per_s']:,.0f} rows/s" if result['rows_per_s'] else ''
+                print(f"{stage:>16} {result['seconds']:>9.3f}s {memory:>9} {rate:>18}")
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"\nResults saved to '{args.output}'.")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\n--- Comparison against '{args.baseline}' ---")
+        regressions = compare(current, baseline, args.threshold, args.memory_threshold, args.memory_floor_mb)
+        if regressions:
+            print(f"\n❌ {len(regressions)} stage(s) regressed beyond the threshold.")
+            sys.exit(1)
+        print("\n✅ No regressions.")
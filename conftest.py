@@ -0,0 +1 @@
+# Lets pytest import the top-level modules (api.py, feature_encoder.py, ...) from tests/.
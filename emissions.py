@@ -0,0 +1,158 @@
+import argparse
+import re
+import numpy as np
+import pandas as pd
+
+# Vectorized Scope 1/2 emissions from activity records (supplierId, dataType, value, unit).
+# Each activity is converted to the canonical unit of its quantity (kWh, m³, L), matched to
+# an emission factor by (source, country) with a country-agnostic fallback, and summed per
+# supplier with np.bincount. Suppliers may report any number of activity rows. Factor and
+# unit resolution runs once per distinct (data type, unit, country) combination, so the cost
+# per activity row is a few hash and array operations; only the distinct suppliers are sorted.
+
+# Canonical unit per quantity and the multiplier from each accepted spelling into it.
+UNIT_CONVERSIONS = {
+    'kWh': {'wh': 1e-3, 'kwh': 1.0, 'mwh': 1e3, 'gwh': 1e6, 'gj': 277.778, 'mj': 0.277778},
+    # 1 therm = 100,000 Btu of natural gas at 1,037 Btu/ft³.
+    'm³': {'m3': 1.0, 'cubic meter': 1.0, 'cubic metre': 1.0, 'ft3': 0.0283168, 'cubic foot': 0.0283168,
+           'cubic feet': 0.0283168, 'ccf': 2.83168, 'mcf': 28.3168, 'therm': 2.7306, 'thm': 2.7306},
+    'L': {'l': 1.0, 'liter': 1.0, 'litre': 1.0, 'ml': 1e-3, 'kl': 1e3, 'gallon': 3.78541, 'gal': 3.78541,
+          'us gallon': 3.78541, 'imperial gallon': 4.54609, 'imp gal': 4.54609},
+}
+UNIT_ALIASES = {alias: (canonical, multiplier) for canonical, aliases in UNIT_CONVERSIONS.items()
+                for alias, multiplier in aliases.items()}
+
+# Factors from step1's original table, in kg CO2e per canonical unit.
+DEFAULT_FACTORS = {'Grid': (0.82, 'kWh'), 'Natural Gas': (2.02, 'm³'), 'Diesel Fuel': (2.68, 'L')}
+# Approximate national grid averages (kg CO2e/kWh); they override the 'Grid' default per country.
+DEFAULT_GRID_FACTORS = {'India': 0.71, 'China': 0.58, 'Vietnam': 0.48, 'Bangladesh': 0.55, 'USA': 0.37,
+                        'Turkey': 0.43, 'Pakistan': 0.38, 'Brazil': 0.10, 'Morocco': 0.63}
+
+
+def normalize_unit(unit):
+    # Returns (canonical unit, multiplier), or (None, nan) for an unknown unit.
+    # Case, spacing, '³' vs '3' and plural 's' are ignored; a 'kg CO2e/...' factor unit yields its denominator.
+    if not isinstance(unit, str):
+        return None, np.nan
+    key = unit.split('/')[-1].replace('³', '3').replace('.', '').casefold()
+    key = re.sub(r'\s+', ' ', key).strip()
+    for candidate in (key, key[:-1] if key.endswith('s') else None, key.replace('feet', 'foot')):
+        if candidate in UNIT_ALIASES:
+            return UNIT_ALIASES[candidate]
+    return None, np.nan
+
+
+def activity_source(data_types):
+    # Electricity is supplied by the grid; every other activity type is its own source.
+    data_types = pd.Series(data_types, dtype=object)
+    codes, uniques = pd.factorize(data_types, use_na_sentinel=False)
+    sources = np.array(['Grid' if 'Electric' in str(u) else u for u in uniques], dtype=object)
+    return pd.Series(sources[codes], index=data_types.index)
+
+
+class EmissionFactorRegistry:
+    def __init__(self):
+        # (source, country or None) -> (kg CO2e per canonical unit, canonical unit)
+        self.factors = {}
+
+    def register(self, source, unit, factor, country=None):
+        canonical, multiplier = normalize_unit(unit)
+        if canonical is None:
+            raise ValueError(f"Unknown unit '{unit}' for source '{source}'.")
+        # A factor per MWh is stored per kWh, and so on.
+        self.factors[(source, country)] = (float(factor) / multiplier, canonical)
+        return self
+
+    @classmethod
+    def from_frame(cls, factors_df):
+        # Columns: source, unit ('kg CO2e/kWh' or just 'kWh'), factor and, optionally, country.
+        registry = cls()
+        countries = factors_df['country'] if 'country' in factors_df.columns else pd.Series(None, index=factors_df.index)
+        for source, unit, factor, country in zip(factors_df['source'], factors_df['unit'], factors_df['factor'], countries):
+            registry.register(source, unit, factor, None if pd.isna(country) else country)
+        return registry
+
+    @classmethod
+    def default(cls):
+        registry = cls()
+        for source, (factor, unit) in DEFAULT_FACTORS.items():
+            registry.register(source, unit, factor)
+        for country, factor in DEFAULT_GRID_FACTORS.items():
+            registry.register('Grid', 'kWh', factor, country)
+        return registry
+
+    def factor(self, source, unit, country=None):
+        # kg CO2e per one `unit` of activity, or nan if no factor applies or the units are incompatible.
+        entry = self.factors.get((source, country)) or self.factors.get((source, None))
+        canonical, multiplier = normalize_unit(unit)
+        if entry is None or canonical != entry[1]:
+            return np.nan
+        return entry[0] * multiplier
+
+
+def activity_factors(activity_df, registry, supplier_countries=None):
+    # kg CO2e per activity unit for every activity row (nan where unmatched).
+    n = len(activity_df)
+    if 'country' in activity_df.columns:
+        countries = activity_df['country']
+    elif supplier_countries is not None:
+        countries = activity_df['supplierId'].map(supplier_countries)
+    else:
+        countries = None
+
+    # One combined code per (data type, unit, country); the registry is consulted once per distinct
+    # combination. Data types are mapped to sources on their distinct values only.
+    columns = [activity_df['dataType'], activity_df['unit']] + ([countries] if countries is not None else [])
+    combined = np.zeros(n, dtype=np.int64)
+    uniques = []
+    for values in columns:
+        codes, col_uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+        combined = combined * len(col_uniques) + codes
+        uniques.append((codes, col_uniques))
+    uniques[0] = (uniques[0][0], activity_source(uniques[0][1]).to_numpy())
+    # Hash-based factorize instead of np.unique: the combinations need no sorting.
+    inverse, distinct = pd.factorize(combined)
+    any_row = np.empty(len(distinct), dtype=np.int64)
+    any_row[inverse] = np.arange(n)
+    factors = np.empty(len(distinct))
+    for i, row in enumerate(any_row):
+        source, unit, country = [col_uniques[codes[row]] for codes, col_uniques in uniques] + [None] * (3 - len(uniques))
+        factors[i] = registry.factor(source, unit, None if pd.isna(country) else country)
+    return factors[inverse]
+
+
+def calculate_emissions(activity_df, registry, supplier_countries=None, return_unmatched=False):
+    # Returns one row per supplierId (sorted) with total_emissions_kg_co2e. Activity rows with an
+    # unknown source or unit, or a unit that does not fit the factor, contribute 0 like step1's
+    # left merge did; return_unmatched=True also returns their boolean mask.
+    factors = activity_factors(activity_df, registry, supplier_countries)
+    emissions = pd.to_numeric(activity_df['value'], errors='coerce').to_numpy(dtype=np.float64) * factors
+    unmatched = np.isnan(factors)
+    # Unsorted factorize; only the per-supplier totals are sorted afterwards, which is far
+    # cheaper than sorting while factorizing every activity row.
+    supplier_codes, suppliers = pd.factorize(activity_df['supplierId'])
+    keep = supplier_codes >= 0  # rows without a supplierId belong to no total
+    totals = np.bincount(supplier_codes[keep], weights=np.nan_to_num(emissions[keep]), minlength=len(suppliers))
+    suppliers = np.asarray(suppliers)
+    # All-string ids sort as fixed-width unicode, much faster than comparing Python objects (same order).
+    order = np.argsort(suppliers.astype(str) if pd.api.types.infer_dtype(suppliers) == 'string' else suppliers, kind='stable')
+    totals_df = pd.DataFrame({'supplierId': suppliers[order], 'total_emissions_kg_co2e': totals[order]})
+    return (totals_df, unmatched) if return_unmatched else totals_df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compute per-supplier emissions from an activity CSV.")
+    parser.add_argument('input', help="Activity CSV: supplierId, dataType, value, unit and optionally country.")
+    parser.add_argument('output', help="Per-supplier totals CSV.")
+    parser.add_argument('--factors', help="Factor CSV (source, unit, factor[, country]); defaults to the built-in registry.")
+    parser.add_argument('--suppliers', help="Supplier CSV with supplierId and country, for per-country grid factors.")
+    args = parser.parse_args()
+
+    registry = EmissionFactorRegistry.from_frame(pd.read_csv(args.factors)) if args.factors else EmissionFactorRegistry.default()
+    supplier_countries = pd.read_csv(args.suppliers).set_index('supplierId')['country'] if args.suppliers else None
+    activity_df = pd.read_csv(args.input)
+    totals_df, unmatched = calculate_emissions(activity_df, registry, supplier_countries, return_unmatched=True)
+    totals_df.to_csv(args.output, index=False)
+    print(f"Saved emissions for {len(totals_df)} suppliers from {len(activity_df)} activity rows to '{args.output}'.")
+    if unmatched.any():
+        print(f"⚠️  {int(unmatched.sum())} activity rows had no matching factor or unit and were counted as 0.")
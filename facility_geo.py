@@ -0,0 +1,282 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from facility_store import FacilityStore, DEFAULT_CACHE_DIR, SOURCE_FILE, ensure_cache
+from features import map_industry_risk
+
+# Spatial index over facility coordinates, built from the memory-mapped facility cache.
+# Coordinates are mapped to 3-D unit vectors and put in a KD-tree: the straight-line
+# (chord) distance between unit vectors is monotonic in the great-circle distance, so
+# radius and nearest-neighbour queries are exact haversine queries at KD-tree speed.
+# Bulk neighbour counts come from a sparse lat/lng grid (GridCounter) whose cost does not
+# grow with the number of neighbours, so dense clusters never degrade into pairwise work;
+# only sparse neighbourhoods, where it is cheap, are recounted exactly on the tree.
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_RADIUS_KM = 10.0
+# Neighbours whose industry risk (features.INDUSTRY_RISK) is at least this count as high risk:
+# dyeing, finishing, printing and spinning.
+HIGH_RISK_INDUSTRY = 4
+KM_PER_DEGREE = EARTH_RADIUS_KM * np.pi / 180
+# Grid cell side as a fraction of the count radius; finer cells are more exact but slower.
+GRID_CELLS_PER_RADIUS = 6
+# Grid counts at or below this are recounted exactly on the KD-tree (cost bounded by the count);
+# above it the grid's approximation is used (about 1% mean and 4% p99 relative error).
+EXACT_COUNT_LIMIT = 128
+DYEING_KEYWORDS = ['dyeing', 'finishing']
+
+PROXIMITY_COLUMNS = ['facility_density', 'high_risk_neighbours', 'dyeing_cluster_km']
+NEARBY_COLUMNS = ['country', 'sector', 'processing_type', 'lat', 'lng']
+
+
+def to_unit_vectors(lat, lng):
+    # Missing or non-numeric coordinates come out as NaN rows.
+    lat = np.radians(pd.to_numeric(pd.Series(lat), errors='coerce').to_numpy(dtype=np.float64))
+    lng = np.radians(pd.to_numeric(pd.Series(lng), errors='coerce').to_numpy(dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)])
+
+
+def km_to_chord(km):
+    return 2 * np.sin(np.minimum(np.asarray(km, dtype=np.float64) / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord, dtype=np.float64) / 2, 0, 1))
+
+
+def unit_vectors_to_degrees(xyz):
+    return np.degrees(np.arcsin(np.clip(xyz[:, 2], -1, 1))), np.degrees(np.arctan2(xyz[:, 1], xyz[:, 0]))
+
+
+class GridCounter:
+    # Facilities binned into cells of cell_km x cell_km (longitude cells are degree-sized, so
+    # their width in km shrinks with latitude). Only occupied cells are stored, as sorted
+    # row-major keys with cumulative counts; a row's run of cells is then two searchsorted
+    # lookups. A radius count adds up, row by row, the cells whose centre lies in the disc.
+
+    def __init__(self, lat, lng, cell_km):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.n_rows = int(np.ceil(180 / self.cell_deg))
+        self.n_cols = int(np.ceil(360 / self.cell_deg))
+        keys = self._row(np.asarray(lat, dtype=np.float64)) * self.n_cols + self._col(np.asarray(lng, dtype=np.float64))
+        self.keys, counts = np.unique(keys, return_counts=True)
+        self.cumulative = np.concatenate([[0], np.cumsum(counts)])
+
+    def _row(self, lat):
+        return np.clip(np.floor((lat + 90) / self.cell_deg), 0, self.n_rows - 1).astype(np.int64)
+
+    def _col(self, lng):
+        return np.clip(np.floor(((lng + 180) % 360) / self.cell_deg), 0, self.n_cols - 1).astype(np.int64)
+
+    def _run(self, rows, lo, hi):
+        # Facilities in columns lo..hi (inclusive, already within 0..n_cols-1) of each row.
+        start = np.searchsorted(self.keys, rows * self.n_cols + lo, side='left')
+        end = np.searchsorted(self.keys, rows * self.n_cols + hi, side='right')
+        return np.where(hi >= lo, self.cumulative[end] - self.cumulative[start], 0)
+
+    def count(self, lat, lng, radius_km):
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = (np.asarray(lng, dtype=np.float64) + 180) % 360
+        # Queries in row-major order keep the searchsorted lookups cache-friendly.
+        order = np.lexsort((lng, self._row(lat)))
+        lat, lng = lat[order], lng[order]
+        q_rows = self._row(lat)
+        counts = np.zeros(len(lat), dtype=np.int64)
+        reach = int(np.ceil(radius_km / KM_PER_DEGREE / self.cell_deg)) + 1
+        for offset in range(-reach, reach + 1):
+            rows = q_rows + offset
+            centre_lat = (rows + 0.5) * self.cell_deg - 90
+            dy_km = np.abs(centre_lat - lat) * KM_PER_DEGREE
+            in_reach = np.flatnonzero((dy_km <= radius_km) & (rows >= 0) & (rows < self.n_rows))
+            if not len(in_reach):
+                continue
+            rows, centre_lat, dy_km = rows[in_reach], centre_lat[in_reach], dy_km[in_reach]
+            half_deg = np.sqrt(radius_km ** 2 - dy_km ** 2) / (KM_PER_DEGREE * np.maximum(np.cos(np.radians(centre_lat)), 1e-12))
+            half_deg = np.minimum(half_deg, 360.0)
+            # Columns whose centre is within half_deg of the query; the range may wrap the antimeridian.
+            lo = np.ceil((lng[in_reach] - half_deg) / self.cell_deg - 0.5).astype(np.int64)
+            hi = np.floor((lng[in_reach] + half_deg) / self.cell_deg - 0.5).astype(np.int64)
+            whole_row = hi - lo + 1 >= self.n_cols
+            lo[whole_row], hi[whole_row] = 0, self.n_cols - 1
+            row_counts = self._run(rows, np.maximum(lo, 0), np.minimum(hi, self.n_cols - 1))
+            wraps = np.flatnonzero((lo < 0) | (hi >= self.n_cols))
+            if len(wraps):
+                wrap_lo = np.where(lo[wraps] < 0, lo[wraps] + self.n_cols, 0)
+                wrap_hi = np.where(lo[wraps] < 0, self.n_cols - 1, hi[wraps] - self.n_cols)
+                row_counts[wraps] += self._run(rows[wraps], wrap_lo, wrap_hi)
+            counts[in_reach] += row_counts
+        out = np.empty_like(counts)
+        out[order] = counts
+        return out
+
+
+def facility_descriptions(store):
+    # Same idea as features.describe_industry: the processing type when known, otherwise the sector.
+    processing_type = pd.Series(store.text_column('processing_type'), dtype=object)
+    return processing_type.where(processing_type.notna(), pd.Series(store.text_column('sector'), dtype=object))
+
+
+class FacilityGeoIndex:
+    def __init__(self, lat, lng, descriptions, store=None, workers=-1):
+        self.store = store
+        # Threads for bulk queries (-1 = all cores); pool workers cap it like XGBoost's nthread.
+        self.workers = workers
+        xyz = to_unit_vectors(lat, lng)
+        valid = np.isfinite(xyz).all(axis=1)
+        # Tree position -> facility row; facilities without coordinates are not indexed.
+        self.rows = np.flatnonzero(valid)
+        self.tree = cKDTree(xyz[valid])
+
+        descriptions = pd.Series(descriptions, dtype=object)[valid].reset_index(drop=True)
+        self.high_risk = map_industry_risk(descriptions).to_numpy() >= HIGH_RISK_INDUSTRY
+        lowered = descriptions.astype(str).str.lower()
+        self.dyeing = np.logical_or.reduce([lowered.str.contains(word, regex=False).to_numpy(dtype=bool) for word in DYEING_KEYWORDS])
+        self.high_risk_tree = cKDTree(self.tree.data[self.high_risk])
+        self.dyeing_tree = cKDTree(self.tree.data[self.dyeing])
+        # (all facilities, high-risk facilities) grids per count radius, built on first use.
+        self._grids = {}
+
+    @classmethod
+    def from_store(cls, store):
+        return cls(store.numeric['lat'], store.numeric['lng'], facility_descriptions(store), store=store)
+
+    @classmethod
+    def open(cls, source_csv=SOURCE_FILE, cache_dir=DEFAULT_CACHE_DIR):
+        return cls.from_store(FacilityStore.open(source_csv, cache_dir))
+
+    def __len__(self):
+        return self.tree.n
+
+    def nearby(self, lat, lng, radius_km=None, k=None):
+        # Returns (facility rows, distances in km), nearest first. With both set, the k nearest within radius_km.
+        point = to_unit_vectors([lat], [lng])[0]
+        if k is not None:
+            upper = km_to_chord(radius_km) if radius_km is not None else np.inf
+            chord, idx = self.tree.query(point, k=min(k, max(len(self), 1)), distance_upper_bound=upper)
+            chord, idx = np.atleast_1d(chord), np.atleast_1d(idx)
+            # Missing neighbours (fewer than k in range) come back as index n with infinite distance.
+            found = idx < len(self)
+            chord, idx = chord[found], idx[found]
+        else:
+            idx = np.asarray(self.tree.query_ball_point(point, km_to_chord(radius_km)), dtype=np.int64)
+            chord = np.linalg.norm(self.tree.data[idx] - point, axis=1)
+            order = np.argsort(chord, kind='stable')
+            chord, idx = chord[order], idx[order]
+        return self.rows[idx], chord_to_km(chord)
+
+    def describe(self, rows, distances_km):
+        # Facility attributes for query results; needs the index to have been built from a FacilityStore.
+        facilities_df = self.store.take(rows, columns=NEARBY_COLUMNS)
+        facilities_df.insert(0, 'name', [self.store.name(row) for row in rows])
+        facilities_df['distance_km'] = distances_km
+        return facilities_df
+
+    def grids(self, radius_km):
+        if radius_km not in self._grids:
+            lat, lng = unit_vectors_to_degrees(self.tree.data)
+            cell_km = radius_km / GRID_CELLS_PER_RADIUS
+            self._grids[radius_km] = (GridCounter(lat, lng, cell_km),
+                                      GridCounter(lat[self.high_risk], lng[self.high_risk], cell_km))
+        return self._grids[radius_km]
+
+    def count_within(self, tree, grid, points, lat, lng, radius_km):
+        # Grid counts everywhere; the sparse ones are replaced by exact tree counts.
+        if not tree.n:
+            return np.zeros(len(points), dtype=np.int64)
+        counts = grid.count(lat, lng, radius_km)
+        sparse = np.flatnonzero(counts <= EXACT_COUNT_LIMIT)
+        if len(sparse):
+            counts[sparse] = tree.query_ball_point(points[sparse], km_to_chord(radius_km), return_length=True, workers=self.workers)
+        return counts
+
+    def proximity_features(self, lat, lng, radius_km=DEFAULT_RADIUS_KM):
+        # facility_density: facilities per 1,000 km2 within radius_km; high_risk_neighbours: high-risk
+        # facilities within radius_km; dyeing_cluster_km: distance to the nearest dyeing/finishing facility.
+        # Both counts include a facility at the point itself. Rows without coordinates get NaN.
+        xyz = to_unit_vectors(lat, lng)
+        valid = np.isfinite(xyz).all(axis=1)
+        points = xyz[valid]
+        out = {col: np.full(len(xyz), np.nan) for col in PROXIMITY_COLUMNS}
+        if len(points):
+            points_lat, points_lng = unit_vectors_to_degrees(points)
+            grid, high_risk_grid = self.grids(radius_km)
+            counts = self.count_within(self.tree, grid, points, points_lat, points_lng, radius_km)
+            out['facility_density'][valid] = counts * 1000 / (np.pi * radius_km ** 2)
+            out['high_risk_neighbours'][valid] = self.count_within(
+                self.high_risk_tree, high_risk_grid, points, points_lat, points_lng, radius_km)
+            if self.dyeing_tree.n:
+                nearest, _ = self.dyeing_tree.query(points, k=1, workers=self.workers)
+                out['dyeing_cluster_km'][valid] = chord_to_km(nearest)
+        return pd.DataFrame(out)
+
+
+def add_proximity_features(df, geo_index, radius_km=DEFAULT_RADIUS_KM):
+    # Adds PROXIMITY_COLUMNS from the supplier's (enriched) lat/lng; missing coordinates give NaN.
+    # Without an index (geo_index=None) every row gets NaN, which the model treats as missing;
+    # leaving the columns out would encode them as 0, i.e. an empty area next to a dyeing unit.
+    if geo_index is None:
+        for col in PROXIMITY_COLUMNS:
+            df[col] = np.nan
+        return df
+    lat = df['lat'] if 'lat' in df.columns else pd.Series(np.nan, index=df.index)
+    lng = df['lng'] if 'lng' in df.columns else pd.Series(np.nan, index=df.index)
+    features_df = geo_index.proximity_features(lat, lng, radius_km)
+    for col in PROXIMITY_COLUMNS:
+        df[col] = features_df[col].to_numpy()
+    return df
+
+
+_loaded_indexes = {}
+
+
+def load_geo_index(cache_dir=DEFAULT_CACHE_DIR):
+    # Opens an existing cache read-only and never builds it, so concurrent workers cannot race
+    # on the .npy files. None when there is no usable cache; add_proximity_features then fills
+    # the proximity features with NaN. Memoized per process: workers forked after prepare_geo_index() inherit the
+    # parent's trees instead of building their own.
+    key = os.path.abspath(cache_dir)
+    if key not in _loaded_indexes:
+        try:
+            _loaded_indexes[key] = FacilityGeoIndex.from_store(FacilityStore(cache_dir))
+        except OSError:
+            _loaded_indexes[key] = None
+    return _loaded_indexes[key]
+
+
+def prepare_geo_index(source_csv=SOURCE_FILE, cache_dir=DEFAULT_CACHE_DIR):
+    # Called once in a parent process (serve.py, bulk scoring, streaming) before it forks:
+    # refreshes the cache if the export changed, then loads the index for the children.
+    try:
+        ensure_cache(source_csv, cache_dir)
+    except OSError as e:
+        print(f"Facility cache not refreshed ({e}); using the cache on disk if there is one.")
+    _loaded_indexes.pop(os.path.abspath(cache_dir), None)
+    return load_geo_index(cache_dir)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the facility spatial index and compute proximity features for every facility.")
+    parser.add_argument('--source', default=SOURCE_FILE)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--radius-km', type=float, default=DEFAULT_RADIUS_KM)
+    parser.add_argument('--output', help="Optional CSV for the per-facility proximity features.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = FacilityStore.open(args.source, args.cache_dir)
+    geo_index = FacilityGeoIndex.from_store(store)
+    print(f"Indexed {len(geo_index)} of {len(store)} facilities in {time.perf_counter() - start:.2f}s "
+          f"({int(geo_index.high_risk.sum())} high-risk, {int(geo_index.dyeing.sum())} dyeing/finishing).")
+
+    start = time.perf_counter()
+    features_df = geo_index.proximity_features(store.numeric['lat'], store.numeric['lng'], args.radius_km)
+    print(f"Proximity features for {len(features_df)} facilities in {time.perf_counter() - start:.2f}s.")
+    print(features_df.describe().T[['mean', '50%', 'max']])
+    if args.output:
+        features_df.insert(0, 'name', store.names())
+        features_df.to_csv(args.output, index=False)
+        print(f"Saved to '{args.output}'.")
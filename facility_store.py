@@ -0,0 +1,260 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from table_schema import FACILITY_SCHEMA, load_table
+
+# One-time ingest of the Open Supply Hub facilities export into a typed, columnar,
+# memory-mapped cache with a persisted hash index on (normalized name, country).
+# Later runs open the cache in milliseconds instead of re-parsing the CSV, and the
+# cache is rebuilt only when the source file actually changes.
+
+SOURCE_FILE = 'facilities-2.csv'
+DEFAULT_CACHE_DIR = 'facilities_cache'
+CACHE_VERSION = 1
+
+# Columns copied onto internal suppliers by step1, in the order they appear in the export.
+ENRICHMENT_COLUMNS = ['lat', 'lng', 'sector', 'number_of_workers', 'processing_type']
+NUMERIC_COLUMNS = ['lat', 'lng']
+# Low-cardinality text is dictionary-encoded (int32 codes + a category list); -1 means missing.
+DICTIONARY_COLUMNS = ['country', 'country_code', 'sector', 'number_of_workers', 'processing_type']
+SOURCE_COLUMNS = {'name': 'name', 'country_name': 'country', 'country_code': 'country_code', 'lat': 'lat', 'lng': 'lng',
+                  'sector': 'sector', 'number_of_workers': 'number_of_workers', 'processing_type': 'processing_type'}
+
+EMPTY_SLOT = -1
+
+
+def normalize_key_part(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    return re.sub(r'\s+', ' ', str(value)).strip().casefold()
+
+
+def key_hash(name, country):
+    key = f"{normalize_key_part(name)}\x1f{normalize_key_part(country)}".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _write_strings(cache_dir, col, values):
+    # Variable-length strings as one UTF-8 buffer plus int64 offsets (Arrow-style), both mmap-able.
+    encoded = [v.encode('utf-8') if isinstance(v, str) else b'' for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(os.path.join(cache_dir, f'{col}.offsets.npy'), offsets)
+    np.save(os.path.join(cache_dir, f'{col}.data.npy'), np.frombuffer(b''.join(encoded), dtype=np.uint8))
+
+
+def _build_index(names, countries):
+    n = len(names)
+    capacity = 1 << max(4, int(2 * n - 1).bit_length())
+    mask = capacity - 1
+    slot_rows = np.full(capacity, EMPTY_SLOT, dtype=np.int64)
+    slot_hashes = np.zeros(capacity, dtype=np.uint64)
+    slot_keys = {}
+    for row, (name, country) in enumerate(zip(names, countries)):
+        h = key_hash(name, country)
+        key = (normalize_key_part(name), normalize_key_part(country))
+        slot = h & mask
+        while slot_rows[slot] != EMPTY_SLOT:
+            if slot_hashes[slot] == h and slot_keys[slot] == key:
+                break  # duplicate facility: keep the first row, like merge + drop_duplicates did
+            slot = (slot + 1) & mask
+        else:
+            slot_rows[slot] = row
+            slot_hashes[slot] = h
+            slot_keys[slot] = key
+    return slot_rows, slot_hashes
+
+
+def _write_manifest(cache_dir, manifest):
+    tmp_path = os.path.join(cache_dir, 'manifest.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(cache_dir, 'manifest.json'))
+
+
+def _swap_into_place(build_dir, cache_dir):
+    # Existing files are never rewritten: readers that still mmap the old cache keep valid
+    # (unlinked) files, and a new reader sees either the old directory or the finished new one.
+    if not os.path.exists(cache_dir):
+        os.rename(build_dir, cache_dir)
+        return
+    old_dir = tempfile.mkdtemp(prefix=f'.{os.path.basename(cache_dir)}.old-', dir=os.path.dirname(cache_dir))
+    os.rename(cache_dir, os.path.join(old_dir, 'cache'))
+    os.rename(build_dir, cache_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def build_cache(source_csv=SOURCE_FILE, cache_dir=DEFAULT_CACHE_DIR, source_sha256=None):
+    # Built in a temporary sibling directory and renamed into place when complete.
+    cache_dir = os.path.abspath(cache_dir)
+    os.makedirs(os.path.dirname(cache_dir), exist_ok=True)
+    build_dir = tempfile.mkdtemp(prefix=f'.{os.path.basename(cache_dir)}.build-', dir=os.path.dirname(cache_dir))
+    try:
+        manifest = _build_cache_files(source_csv, build_dir, source_sha256)
+        _swap_into_place(build_dir, cache_dir)
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+    return manifest
+
+
+def _build_cache_files(source_csv, cache_dir, source_sha256):
+    # Text is parsed straight into categoricals, so the full export never exists as Python strings per cell.
+    raw_df = load_table(source_csv, {c: FACILITY_SCHEMA[c] for c in SOURCE_COLUMNS}, usecols=list(SOURCE_COLUMNS))
+    raw_df = raw_df.rename(columns=SOURCE_COLUMNS)
+
+    manifest = {'version': CACHE_VERSION, 'rows': len(raw_df), 'categories': {}}
+    for col in NUMERIC_COLUMNS:
+        np.save(os.path.join(cache_dir, f'{col}.npy'), raw_df[col].to_numpy(dtype=np.float64))
+    for col in DICTIONARY_COLUMNS:
+        codes, categories = pd.factorize(raw_df[col])
+        np.save(os.path.join(cache_dir, f'{col}.codes.npy'), codes.astype(np.int32))
+        manifest['categories'][col] = [str(c) for c in categories]
+    names = raw_df['name'].tolist()
+    countries = raw_df['country'].tolist()
+    _write_strings(cache_dir, 'name', names)
+
+    slot_rows, slot_hashes = _build_index(names, countries)
+    np.save(os.path.join(cache_dir, 'index.rows.npy'), slot_rows)
+    np.save(os.path.join(cache_dir, 'index.hashes.npy'), slot_hashes)
+
+    manifest['source'] = _source_stamp(source_csv)
+    manifest['source']['sha256'] = source_sha256 or file_sha256(source_csv)
+    # The manifest is written last, so an incomplete directory is never mistaken for a valid cache.
+    _write_manifest(cache_dir, manifest)
+    return manifest
+
+
+def ensure_cache(source_csv=SOURCE_FILE, cache_dir=DEFAULT_CACHE_DIR, force=False):
+    # Returns True if the cache was (re)built.
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        stamp = _source_stamp(source_csv)
+        cached = manifest.get('source', {})
+        if manifest.get('version') == CACHE_VERSION:
+            if stamp['size'] == cached.get('size') and stamp['mtime_ns'] == cached.get('mtime_ns'):
+                return False
+            # The file was touched; only rebuild if its content actually changed.
+            sha = file_sha256(source_csv)
+            if sha == cached.get('sha256'):
+                manifest['source'].update(stamp)
+                _write_manifest(cache_dir, manifest)
+                return False
+            build_cache(source_csv, cache_dir, source_sha256=sha)
+            return True
+    build_cache(source_csv, cache_dir)
+    return True
+
+
+class FacilityStore:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        with open(os.path.join(cache_dir, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        load = lambda name: np.load(os.path.join(cache_dir, name), mmap_mode='r')
+        self.numeric = {col: load(f'{col}.npy') for col in NUMERIC_COLUMNS}
+        self.codes = {col: load(f'{col}.codes.npy') for col in DICTIONARY_COLUMNS}
+        self.categories = {col: np.array(cats, dtype=object) for col, cats in self.manifest['categories'].items()}
+        self._name_offsets = load('name.offsets.npy')
+        self._name_data = load('name.data.npy')
+        self._slot_rows = load('index.rows.npy')
+        self._slot_hashes = load('index.hashes.npy')
+        self._mask = len(self._slot_rows) - 1
+
+    @classmethod
+    def open(cls, source_csv=SOURCE_FILE, cache_dir=DEFAULT_CACHE_DIR, force=False):
+        ensure_cache(source_csv, cache_dir, force=force)
+        return cls(cache_dir)
+
+    def __len__(self):
+        return self.manifest['rows']
+
+    def name(self, row):
+        return bytes(self._name_data[self._name_offsets[row]:self._name_offsets[row + 1]]).decode('utf-8')
+
+    def names(self):
+        data = bytes(self._name_data)
+        offsets = self._name_offsets.tolist()
+        return [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(self))]
+
+    def text_column(self, col, rows=None):
+        codes = np.asarray(self.codes[col] if rows is None else self.codes[col][rows])
+        values = np.append(self.categories[col], np.nan)
+        return values[np.where(codes >= 0, codes, len(values) - 1)]
+
+    def _row_key(self, row):
+        code = self.codes['country'][row]
+        country = self.categories['country'][code] if code >= 0 else None
+        return normalize_key_part(self.name(row)), normalize_key_part(country)
+
+    def lookup(self, name, country):
+        # Expected O(1): hash the normalized key and linear-probe the open-addressing table.
+        h = key_hash(name, country)
+        key = (normalize_key_part(name), normalize_key_part(country))
+        slot = h & self._mask
+        while True:
+            row = int(self._slot_rows[slot])
+            if row == EMPTY_SLOT:
+                return EMPTY_SLOT
+            if int(self._slot_hashes[slot]) == h and self._row_key(row) == key:
+                return row
+            slot = (slot + 1) & self._mask
+
+    def lookup_many(self, names, countries):
+        return np.array([self.lookup(name, country) for name, country in zip(names, countries)], dtype=np.int64)
+
+    def take(self, rows, columns=ENRICHMENT_COLUMNS):
+        # Gathers facility attributes for the given rows; EMPTY_SLOT rows come back as NaN.
+        rows = np.asarray(rows, dtype=np.int64)
+        found = rows != EMPTY_SLOT
+        safe_rows = np.where(found, rows, 0)
+        out = {}
+        for col in columns:
+            if col in self.numeric:
+                values = np.asarray(self.numeric[col][safe_rows], dtype=np.float64)
+                out[col] = np.where(found, values, np.nan)
+            else:
+                values = self.text_column(col, safe_rows)
+                values[~found] = np.nan
+                out[col] = values
+        return pd.DataFrame(out)
+
+    def enrich(self, suppliers_df, rows=None):
+        if rows is None:
+            rows = self.lookup_many(suppliers_df['name'], suppliers_df['country'])
+        enrichment_df = self.take(rows)
+        enrichment_df.index = suppliers_df.index
+        return pd.concat([suppliers_df, enrichment_df], axis=1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ingest the facilities export into the memory-mapped cache.")
+    parser.add_argument('--source', default=SOURCE_FILE)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--force', action='store_true', help="Rebuild even if the source is unchanged.")
+    args = parser.parse_args()
+
+    rebuilt = ensure_cache(args.source, args.cache_dir, force=args.force)
+    store = FacilityStore(args.cache_dir)
+    status = "Built" if rebuilt else "Up to date:"
+    print(f"{status} facility cache '{args.cache_dir}' with {len(store)} facilities from '{args.source}'.")
@@ -0,0 +1,143 @@
+import json
+import numpy as np
+
+# Lean inference for the trained booster. export_model() (run by step3) saves the booster
+# in XGBoost's native UBJSON format and also "compiles" its trees into flat, padded NumPy
+# arrays plus a JSON feature schema. CompiledModel then scores a float32 feature matrix
+# with nothing but NumPy: every tree is walked in lock-step, one vectorized step per depth
+# level. Importing this module does not pull in xgboost, pandas or sklearn, so workers
+# start fast and skip the sklearn wrapper's per-call DataFrame validation.
+
+NATIVE_MODEL_FILE = 'esg_risk_model.ubj'
+COMPILED_MODEL_FILE = 'esg_risk_model_trees.npz'
+SCHEMA_FILE = 'model_schema.json'
+SCHEMA_VERSION = 1
+# Rows walked through the trees at a time. The walk keeps a few [rows, n_trees] arrays alive,
+# so chunking bounds that working set (a few MB at ~450 trees) whatever the batch size.
+PREDICT_CHUNK_ROWS = 1024
+
+
+class CompiledModel:
+    def __init__(self, arrays, schema):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.default_left = arrays['default_left']
+        self.is_leaf = arrays['is_leaf']
+        self.leaf_value = arrays['leaf_value']
+        self.tree_class = arrays['tree_class']
+        self.base_margin = arrays['base_margin']
+        self.max_depth = int(arrays['max_depth'])
+        self.columns = schema['columns']
+        self.classes_ = np.array(schema['classes'], dtype=object)
+        self.n_classes = len(self.base_margin)
+        self._tree_index = np.arange(len(self.tree_class))
+
+    @classmethod
+    def load(cls, compiled_file=COMPILED_MODEL_FILE, schema_file=SCHEMA_FILE):
+        with open(schema_file) as f:
+            schema = json.load(f)
+        if schema.get('version') != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported model schema version {schema.get('version')}; re-run step3_model_training.py.")
+        with np.load(compiled_file) as arrays:
+            return cls(dict(arrays), schema)
+
+    def predict_margin(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if X.shape[1] != len(self.columns):
+            raise ValueError(f"Expected {len(self.columns)} features, got {X.shape[1]}.")
+        margin = np.empty((len(X), self.n_classes), dtype=np.float64)
+        for start in range(0, len(X), PREDICT_CHUNK_ROWS):
+            margin[start:start + PREDICT_CHUNK_ROWS] = self._leaf_sums(X[start:start + PREDICT_CHUNK_ROWS])
+        return margin + self.base_margin
+
+    def _leaf_sums(self, X):
+        rows = np.arange(len(X))[:, np.newaxis]
+        node = np.zeros((len(X), len(self.tree_class)), dtype=np.int32)
+        for _ in range(self.max_depth):
+            values = X[rows, self.feature[self._tree_index, node]]
+            go_left = np.where(np.isnan(values), self.default_left[self._tree_index, node], values < self.threshold[self._tree_index, node])
+            next_node = np.where(go_left, self.left[self._tree_index, node], self.right[self._tree_index, node])
+            node = np.where(self.is_leaf[self._tree_index, node], node, next_node)
+        leaves = self.leaf_value[self._tree_index, node]
+        sums = np.zeros((len(X), self.n_classes), dtype=np.float64)
+        for k in range(self.n_classes):
+            sums[:, k] = leaves[:, self.tree_class == k].sum(axis=1)
+        return sums
+
+    def predict_proba(self, X):
+        margin = self.predict_margin(X)
+        margin -= margin.max(axis=1, keepdims=True)
+        exp = np.exp(margin)
+        return (exp / exp.sum(axis=1, keepdims=True)).astype(np.float32)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def compile_booster(booster):
+    # Flattens a gbtree booster's JSON dump into padded [n_trees, max_nodes] arrays.
+    model = json.loads(booster.save_raw('json'))
+    gradient_booster = model['learner']['gradient_booster']
+    if gradient_booster['name'] != 'gbtree':
+        raise ValueError(f"Only gbtree boosters can be compiled, not '{gradient_booster['name']}'.")
+    trees = gradient_booster['model']['trees']
+    max_nodes = max(len(tree['left_children']) for tree in trees)
+
+    def padded(key, dtype, fill):
+        out = np.full((len(trees), max_nodes), fill, dtype=dtype)
+        for i, tree in enumerate(trees):
+            out[i, :len(tree[key])] = tree[key]
+        return out
+
+    left = padded('left_children', np.int32, -1)
+    right = padded('right_children', np.int32, -1)
+    is_leaf = left == -1
+    split_conditions = padded('split_conditions', np.float32, 0)
+    arrays = {
+        'feature': np.where(is_leaf, 0, padded('split_indices', np.int32, 0)).astype(np.int32),
+        'threshold': split_conditions,
+        'left': left,
+        'right': right,
+        'default_left': padded('default_left', np.int8, 0).astype(bool),
+        'is_leaf': is_leaf,
+        # For leaves, XGBoost stores the leaf weight in split_conditions.
+        'leaf_value': np.where(is_leaf, split_conditions, 0).astype(np.float32),
+        'tree_class': np.array(gradient_booster['model']['tree_info'], dtype=np.int32),
+        'max_depth': np.array(max(_tree_depth(tree) for tree in trees), dtype=np.int32),
+    }
+    n_classes = int(model['learner']['learner_model_param'].get('num_class', '1')) or 1
+    arrays['base_margin'] = np.zeros(n_classes, dtype=np.float64)
+
+    # The intercept encoding differs between XGBoost versions, so derive it from the booster itself:
+    # whatever margin it predicts beyond the sum of our leaves is the per-class base margin.
+    probe = np.zeros((1, booster.num_features()), dtype=np.float32)
+    booster_margin = booster.inplace_predict(probe, predict_type='margin').reshape(1, -1)
+    compiled = CompiledModel(arrays, {'columns': [''] * booster.num_features(), 'classes': list(range(n_classes))})
+    arrays['base_margin'] = (booster_margin - compiled.predict_margin(probe))[0]
+    return arrays
+
+
+def _tree_depth(tree):
+    left, right = tree['left_children'], tree['right_children']
+    depth, frontier = 0, [0]
+    while frontier:
+        frontier = [child for node in frontier if left[node] != -1 for child in (left[node], right[node])]
+        if frontier:
+            depth += 1
+    return depth
+
+
+def export_model(xgb_model, model_columns, classes, native_file=NATIVE_MODEL_FILE,
+                 compiled_file=COMPILED_MODEL_FILE, schema_file=SCHEMA_FILE):
+    booster = xgb_model.get_booster()
+    booster.save_model(native_file)
+    np.savez(compiled_file, **compile_booster(booster))
+    schema = {'version': SCHEMA_VERSION, 'columns': [str(col) for col in model_columns], 'classes': [str(c) for c in classes],
+              'objective': json.loads(booster.save_config())['learner']['objective']['name']}
+    with open(schema_file, 'w') as f:
+        json.dump(schema, f, indent=2)
+    return CompiledModel.load(compiled_file, schema_file)
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLS = ['country', 'industryVertical', 'processing_type', 'sector', 'industry_description']
+NUMBER_TYPES = (bool, int, float, np.number, np.bool_)
+
+
+class FeatureEncoder:
+    # Replaces pd.get_dummies + select_dtypes + reindex at serving time.
+    # Built from the model's training columns, it maps every numeric column and
+    # every one-hot slot (e.g. 'country_India') straight to its position in the
+    # model matrix, so encoding is a handful of dict lookups into a float32 array.
+
+    def __init__(self, model_columns, categorical_cols=CATEGORICAL_COLS):
+        self.columns = [str(col) for col in model_columns]
+        self.categorical_cols = list(categorical_cols)
+        self.numeric_index = {}
+        self.category_index = {field: {} for field in self.categorical_cols}
+
+        # Longest prefix first so a field name that prefixes another can never steal its columns.
+        prefixes = sorted(self.categorical_cols, key=len, reverse=True)
+        for idx, col in enumerate(self.columns):
+            field = next((f for f in prefixes if col.startswith(f + '_')), None)
+            if field is None:
+                self.numeric_index[col] = idx
+            else:
+                self.category_index[field][col[len(field) + 1:]] = idx
+
+    @property
+    def n_features(self):
+        return len(self.columns)
+
+    def transform(self, data):
+        # Accepts a featured DataFrame, a single dict or a list of dicts.
+        if isinstance(data, pd.DataFrame):
+            return self._transform_frame(data)
+        if isinstance(data, dict):
+            data = [data]
+        return self._transform_records(data)
+
+    def _transform_records(self, records):
+        X = np.zeros((len(records), self.n_features), dtype=np.float32)
+        for row, record in zip(X, records):
+            for col, idx in self.numeric_index.items():
+                value = record.get(col)
+                # Mirrors select_dtypes(include=['number', 'bool']): text values are dropped (left at 0).
+                if isinstance(value, NUMBER_TYPES):
+                    row[idx] = value
+            for field, categories in self.category_index.items():
+                value = record.get(field)
+                if value is None or (isinstance(value, float) and np.isnan(value)):
+                    continue
+                idx = categories.get(str(value))
+                if idx is not None:
+                    row[idx] = 1
+        return X
+
+    def _transform_frame(self, df):
+        X = np.zeros((len(df), self.n_features), dtype=np.float32)
+        for col, idx in self.numeric_index.items():
+            if col not in df.columns:
+                continue
+            values = df[col]
+            if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+                X[:, idx] = values.to_numpy(dtype=np.float32, na_value=np.nan)
+            elif values.dtype == object:
+                # Mixed text/number columns (a worker band next to a count) go value by value, as in
+                # _transform_records, so a text value only zeroes its own row rather than the column.
+                is_number = np.fromiter((isinstance(v, NUMBER_TYPES) for v in values), dtype=bool, count=len(values))
+                X[is_number, idx] = values[is_number].to_numpy(dtype=np.float32)
+        rows = np.arange(len(df))
+        for field, categories in self.category_index.items():
+            if field not in df.columns or not categories:
+                continue
+            # Look up each distinct category once, then scatter by code (NaN factorizes to -1).
+            codes, uniques = pd.factorize(df[field])
+            lookup = np.array([categories.get(str(u), -1) for u in uniques] + [-1], dtype=np.int64)
+            slots = lookup[codes]
+            hit = slots >= 0
+            X[rows[hit], slots[hit]] = 1
+        return X
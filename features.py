@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# Shared, vectorized feature engineering used by step2 (training data), api.py and
+# step4 (serving). Every transform works on whole columns; nothing here runs per row.
+
+GEOPOLITICAL_RISK = {'India': 3, 'China': 4, 'Vietnam': 2, 'Bangladesh': 4, 'USA': 1, 'Turkey': 3, 'Pakistan': 5, 'Brazil': 3, 'Morocco': 3}
+INDUSTRY_RISK = {'Dyeing': 5, 'Printing': 4, 'Finishing': 5, 'Spinning': 4, 'Weaving': 3, 'Manufacturing': 3, 'Logistics': 1, 'Packaging': 1, 'Unspecified': 2}
+DEFAULT_GEOPOLITICAL_RISK = 3
+DEFAULT_INDUSTRY_RISK = 2
+
+BOOLEAN_COLS = ['is_iso14001_certified', 'is_sa8000_certified', 'has_anti_corruption_policy', 'publishes_esg_report']
+
+# "low-high" worker bands such as "51-200"; anything else (blank, "0", free text) parses to 0.
+WORKER_RANGE_PATTERN = r'^\s*\+?(\d+)\s*-\s*\+?(\d+)\s*$'
+
+
+def _column(df, col):
+    # Missing columns behave like all-NaN, matching row.get() in the old row-wise code.
+    if col not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    # Categoricals (table_schema.py) are read as plain values so fillna/where can add new ones.
+    return df[col].astype(object) if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col]
+
+
+def fill_supplier_defaults(df):
+    # Enrichment leaves facility fields blank for unmatched suppliers; these are the defaults step2 trains on.
+    df['number_of_workers'] = _column(df, 'number_of_workers').fillna('0')
+    df['processing_type'] = _column(df, 'processing_type').fillna('Unspecified')
+    return df
+
+
+def describe_industry(df, unspecified_is_missing=False):
+    processing_type = _column(df, 'processing_type')
+    use_processing_type = processing_type.notna()
+    if unspecified_is_missing:
+        use_processing_type &= processing_type != 'Unspecified'
+    return processing_type.where(use_processing_type, _column(df, 'industryVertical'))
+
+
+def _on_distinct(values, func):
+    # Text columns here are low-cardinality, so run the string work once per distinct value and scatter back.
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return pd.Series(func(pd.Series(uniques, dtype=object)).to_numpy()[codes], index=values.index)
+
+
+def map_industry_risk(descriptions):
+    # The first INDUSTRY_RISK keyword (in dict order) found anywhere in the description wins.
+    def score(distinct):
+        lowered = distinct.astype(str).str.lower()
+        conditions = [lowered.str.contains(word.lower(), regex=False).to_numpy(dtype=bool) for word in INDUSTRY_RISK]
+        return pd.Series(np.select(conditions, list(INDUSTRY_RISK.values()), default=DEFAULT_INDUSTRY_RISK))
+    return _on_distinct(descriptions, score)
+
+
+def parse_workers(workers):
+    def midpoint(distinct):
+        worker_str = distinct.astype(str)
+        bounds = worker_str.str.extract(WORKER_RANGE_PATTERN).astype(float)
+        band_midpoint = ((bounds[0] + bounds[1]) / 2).fillna(0)
+        return pd.Series(np.where(worker_str.str.contains('5001+', regex=False), 7500, band_midpoint))
+    return _on_distinct(workers, midpoint)
+
+
+def emission_intensity(total_emissions, worker_count_avg):
+    workers = worker_count_avg.to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        intensity = np.where(workers > 0, total_emissions.to_numpy(dtype=float) / workers, 0)
+    return pd.Series(intensity, index=worker_count_avg.index)
+
+
+def add_environmental_features(df, unspecified_is_missing=False):
+    df['geopolitical_risk'] = _column(df, 'country').map(GEOPOLITICAL_RISK).fillna(DEFAULT_GEOPOLITICAL_RISK)
+    df['industry_description'] = describe_industry(df, unspecified_is_missing)
+    df['industry_risk'] = map_industry_risk(df['industry_description'])
+    df['worker_count_avg'] = parse_workers(_column(df, 'number_of_workers'))
+    df['emission_intensity'] = emission_intensity(df['total_emissions_kg_co2e'], df['worker_count_avg'])
+    return df
+
+
+def create_features(df, unspecified_is_missing=False):
+    # Serving-time features: the environmental features plus the S & G flags cast to bool.
+    add_environmental_features(df, unspecified_is_missing)
+    for col in BOOLEAN_COLS:
+        df[col] = df[col].astype(bool)
+    return df
+
+
+def assign_risk_level(df):
+    score = df['geopolitical_risk'] + df['industry_risk']
+    # E Score
+    score += np.where(df['total_emissions_kg_co2e'] > 80000, 2, 0)
+    score += np.where(df['water_usage_m3'] > 100000, 1, 0)
+    score -= np.where(df['is_iso14001_certified'].astype(bool), 2, 0)
+    # S Score
+    score += np.where(df['turnover_rate_percent'] > 20, 1, 0)
+    score += np.where(df['workplace_accidents_last_year'] > 5, 2, 0)
+    score -= np.where(df['is_sa8000_certified'].astype(bool), 3, 0)
+    # G Score
+    score += np.where(~df['has_anti_corruption_policy'].astype(bool), 2, 0)
+    score += np.where(~df['publishes_esg_report'].astype(bool), 1, 0)
+    # Classification
+    return pd.Series(np.select([score >= 9, score >= 5], ['High', 'Medium'], default='Low'), index=df.index)
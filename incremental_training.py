@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+import random
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.base import clone
+from facility_geo import add_proximity_features, prepare_geo_index
+from facility_store import ENRICHMENT_COLUMNS
+from features import add_environmental_features, assign_risk_level, fill_supplier_defaults
+from feature_encoder import FeatureEncoder, CATEGORICAL_COLS
+from fast_inference import export_model
+
+# Incremental retraining. New supplier data (master_dataset.csv format) is keyed by
+# supplierId plus a content hash of its raw columns; only new or changed rows are
+# featurized (same transforms as step2) and upserted into a persisted feature store.
+# The model then either continues boosting from esg_risk_model.pkl on the updated
+# store (XGBoost warm start) or, once a drift threshold is crossed, is refit from
+# scratch with the same hyperparameters. New countries/industries extend the one-hot
+# column set by appending columns, so existing trees keep their feature indices.
+
+warnings.filterwarnings('ignore')
+
+FEATURE_STORE_FILE = 'feature_store.pkl'
+STATE_FILE = 'incremental_state.json'
+SEED_FILE = 'featured_dataset.csv'
+MODEL_FILE = 'esg_risk_model.pkl'
+MODEL_COLUMNS_FILE = 'model_columns.pkl'
+FEATURE_ENCODER_FILE = 'feature_encoder.pkl'
+LABEL_ENCODER_FILE = 'label_encoder.pkl'
+
+RAW_COLUMNS = ['supplierId', 'name', 'country', 'industryVertical', 'water_usage_m3', 'turnover_rate_percent',
+               'workplace_accidents_last_year', 'has_anti_corruption_policy', 'publishes_esg_report',
+               'total_emissions_kg_co2e'] + ENRICHMENT_COLUMNS
+CERTIFICATION_COLS = ['is_iso14001_certified', 'is_sa8000_certified']
+# Stored and incoming rows are always hashed over the same columns.
+HASH_COLUMNS = RAW_COLUMNS + CERTIFICATION_COLS
+HASH_COLUMN = 'content_hash'
+PSI_BINS = 10
+
+
+# --- Feature store ---
+def content_hash(df, columns):
+    # Hash a canonical form so CSV dtype quirks (int vs float, blank vs default) don't look like changes.
+    # A spurious mismatch only costs a re-featurization, never a wrong feature row.
+    df = fill_supplier_defaults(df[[col for col in columns if col in df.columns]].copy())
+    canonical = pd.DataFrame(index=df.index)
+    for col in columns:
+        if col == 'supplierId':
+            continue
+        values = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+        if pd.api.types.is_bool_dtype(values):
+            values = values.astype('float64')
+        # Per value, so '0' in a text column and 0 in an int column hash alike.
+        numeric = pd.to_numeric(values, errors='coerce')
+        canonical[col] = np.where(numeric.notna(), numeric.astype('float64').astype(str), values.astype(str))
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy(dtype=np.uint64)
+
+
+def load_feature_store(path=FEATURE_STORE_FILE, seed_file=SEED_FILE):
+    if os.path.exists(path):
+        return joblib.load(path)
+    # First run: adopt the step2 output as the store.
+    store = pd.read_csv(seed_file)
+    store[HASH_COLUMN] = content_hash(store, HASH_COLUMNS)
+    return store
+
+
+def featurize_rows(df, seed=42, geo_index=None):
+    # Mirrors step2. Certifications are taken from the input when present, otherwise drawn like step2 does.
+    df = fill_supplier_defaults(df.copy())
+    add_environmental_features(df, unspecified_is_missing=True)
+    add_proximity_features(df, geo_index)
+    rng = random.Random(seed)
+    for col in CERTIFICATION_COLS:
+        values = df[col].astype(object) if col in df.columns else pd.Series(np.nan, index=df.index, dtype=object)
+        missing = values.isna().to_numpy()
+        values[missing] = [rng.choice([True, False]) for _ in range(int(missing.sum()))]
+        df[col] = values.astype(bool)
+    df['risk_level'] = assign_risk_level(df)
+    return df
+
+
+def diff_rows(store, new_df):
+    # Returns the rows of new_df whose supplierId is unknown or whose content hash changed.
+    new_df = new_df.drop_duplicates('supplierId', keep='last').reset_index(drop=True)
+    stored = store.set_index('supplierId')
+    # Certifications the input leaves out are taken from the store, so an omitted flag is not a
+    # change; new suppliers keep them missing and get them drawn in featurize_rows.
+    for col in CERTIFICATION_COLS:
+        from_store = new_df['supplierId'].map(stored[col])
+        new_df[col] = new_df[col].where(new_df[col].notna(), from_store) if col in new_df.columns else from_store
+    new_df[HASH_COLUMN] = content_hash(new_df, HASH_COLUMNS)
+    known = stored[HASH_COLUMN]
+    is_new = ~new_df['supplierId'].isin(known.index).to_numpy()
+    is_changed = np.zeros(len(new_df), dtype=bool)
+    is_changed[~is_new] = known.reindex(new_df['supplierId'][~is_new]).to_numpy(dtype=np.uint64) != new_df[HASH_COLUMN].to_numpy()[~is_new]
+    return new_df[is_new | is_changed], int(is_new.sum()), int(is_changed.sum())
+
+
+def upsert(store, featured):
+    kept = store[~store['supplierId'].isin(featured['supplierId'])]
+    return pd.concat([kept, featured[store.columns.intersection(featured.columns)]], ignore_index=True)
+
+
+# --- Model columns ---
+def extend_model_columns(model_columns, store, featured):
+    # Append one-hot slots for categories the store had never seen. The drop_first baseline of
+    # the original fit keeps its all-zeros encoding, and existing columns keep their positions.
+    columns = list(model_columns)
+    existing = set(columns)
+    for field in CATEGORICAL_COLS:
+        if field not in featured.columns:
+            continue
+        seen = set(store[field].dropna().astype(str)) if field in store.columns else set()
+        for value in pd.unique(featured[field].dropna().astype(str)):
+            col = f'{field}_{value}'
+            if value not in seen and col not in existing:
+                columns.append(col)
+                existing.add(col)
+    return columns
+
+
+def widen_booster(booster, columns):
+    # XGBoost refuses to continue training on more columns than the booster was built with, so
+    # raise its feature count in the serialized model; existing splits only index old columns.
+    model = json.loads(booster.save_raw('json'))
+    learner = model['learner']
+    learner['learner_model_param']['num_feature'] = str(len(columns))
+    learner['feature_names'] = [str(col) for col in columns]
+    learner['feature_types'] = ['float'] * len(columns)
+    widened = xgb.Booster()
+    widened.load_model(bytearray(json.dumps(model).encode()))
+    return widened
+
+
+# --- Drift ---
+def numeric_profile(X, columns):
+    profile = {}
+    for col, idx in columns.items():
+        values = X[:, idx].astype(np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            continue
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, PSI_BINS + 1)))[1:-1]
+        profile[col] = {'edges': edges.tolist(), 'proportions': _bin_proportions(values, edges).tolist()}
+    return profile
+
+
+def _bin_proportions(values, edges):
+    counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+    return counts / max(len(values), 1)
+
+
+def population_stability(expected, actual, eps=1e-4):
+    expected = np.clip(np.asarray(expected), eps, None)
+    actual = np.clip(np.asarray(actual), eps, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def class_distribution(labels, classes):
+    counts = pd.Series(labels).value_counts(normalize=True)
+    return {str(c): float(counts.get(c, 0.0)) for c in classes}
+
+
+def drift_report(state, store, X, encoder, classes):
+    current = class_distribution(store['risk_level'], classes)
+    label_shift = 0.5 * sum(abs(current[c] - state['class_distribution'].get(c, 0.0)) for c in current)
+    psi = {}
+    for col, reference in state['numeric_profile'].items():
+        idx = encoder.numeric_index.get(col)
+        if idx is None:
+            continue
+        values = X[:, idx].astype(np.float64)
+        values = values[~np.isnan(values)]
+        psi[col] = population_stability(reference['proportions'], _bin_proportions(values, np.asarray(reference['edges'])))
+    return {
+        'churn': state['rows_changed_since_full_fit'] / max(len(store), 1),
+        'label_shift': label_shift,
+        'max_psi': max(psi.values(), default=0.0),
+        'max_psi_column': max(psi, key=psi.get) if psi else None,
+        'rounds_since_full_fit': state['rounds_since_full_fit'],
+    }
+
+
+def reference_state(store, X, encoder, classes):
+    return {
+        'full_fit_rows': len(store),
+        'rows_changed_since_full_fit': 0,
+        'rounds_since_full_fit': 0,
+        'class_distribution': class_distribution(store['risk_level'], classes),
+        'numeric_profile': numeric_profile(X, encoder.numeric_index),
+    }
+
+
+# --- Update ---
+def run_update(input_file, args):
+    store = load_feature_store(args.store)
+    model = joblib.load(MODEL_FILE)
+    model_columns = list(joblib.load(MODEL_COLUMNS_FILE))
+    le = joblib.load(LABEL_ENCODER_FILE)
+
+    if os.path.exists(args.state):
+        with open(args.state) as f:
+            state = json.load(f)
+    else:
+        # The current model was fit by step3 on the seed data: that is the drift reference.
+        seed_encoder = FeatureEncoder(model_columns)
+        state = reference_state(store, seed_encoder.transform(store), seed_encoder, le.classes_)
+
+    new_df = pd.read_csv(input_file)
+    missing = [col for col in RAW_COLUMNS if col not in new_df.columns and col not in ENRICHMENT_COLUMNS]
+    if missing:
+        raise ValueError(f"'{input_file}' is missing required columns: {missing}")
+    rows, n_new, n_changed = diff_rows(store, new_df)
+    print(f"Loaded {len(new_df)} supplier rows: {n_new} new, {n_changed} changed, {len(new_df) - n_new - n_changed} unchanged.")
+    if rows.empty and not args.full_refit:
+        print("Nothing to update.")
+        return
+
+    featured = featurize_rows(rows.drop(columns=[HASH_COLUMN]), seed=args.seed, geo_index=prepare_geo_index())
+    # Hashed again now that new suppliers have their certifications, so the stored hash matches
+    # what diff_rows computes for the same row next time.
+    featured[HASH_COLUMN] = content_hash(featured, HASH_COLUMNS)
+    columns = extend_model_columns(model_columns, store, featured)
+    if len(columns) > len(model_columns):
+        print(f"Extending model columns with {columns[len(model_columns):]}")
+
+    if not rows.empty:
+        # The old model's accuracy on the incoming rows, before it has seen them.
+        old_encoder = FeatureEncoder(model_columns)
+        y_incoming = le.transform(featured['risk_level'])
+        accuracy = np.mean(model.predict(pd.DataFrame(old_encoder.transform(featured), columns=model_columns)) == y_incoming)
+        print(f"Current model accuracy on incoming rows: {accuracy:.2f}")
+
+    store = upsert(store, featured)
+    encoder = FeatureEncoder(columns)
+    X = pd.DataFrame(encoder.transform(store), columns=columns)
+    y = le.transform(store['risk_level'])
+
+    state['rows_changed_since_full_fit'] += len(rows)
+    drift = drift_report(state, store, X.to_numpy(), encoder, le.classes_)
+    print(f"Drift: churn {drift['churn']:.2f}, label shift {drift['label_shift']:.3f}, "
+          f"max PSI {drift['max_psi']:.3f} ({drift['max_psi_column']}), {drift['rounds_since_full_fit']} rounds since full fit.")
+    reasons = [reason for reason, crossed in [
+        ('forced', args.full_refit),
+        ('churn', drift['churn'] > args.max_churn),
+        ('label shift', drift['label_shift'] > args.max_label_shift),
+        ('feature PSI', drift['max_psi'] > args.max_psi),
+        ('round budget', drift['rounds_since_full_fit'] + args.rounds > args.max_added_rounds),
+    ] if crossed]
+
+    if reasons:
+        print(f"Full refit ({', '.join(reasons)}) on {len(store)} rows...")
+        model = clone(model).fit(X, y)
+        state = reference_state(store, X.to_numpy(), encoder, le.classes_)
+    else:
+        print(f"Warm start: boosting {args.rounds} more rounds on {len(store)} rows...")
+        booster = widen_booster(model.get_booster(), columns)
+        model = xgb.XGBClassifier(**{**model.get_params(), 'n_estimators': args.rounds}).fit(X, y, xgb_model=booster)
+        state['rounds_since_full_fit'] += args.rounds
+    print(f"Model now has {model.get_booster().num_boosted_rounds()} boosting rounds; training accuracy {np.mean(model.predict(X) == y):.2f}.")
+
+    joblib.dump(model, MODEL_FILE)
+    joblib.dump(pd.Index(columns), MODEL_COLUMNS_FILE)
+    joblib.dump(encoder, FEATURE_ENCODER_FILE)
+    export_model(model, columns, le.classes_)
+    joblib.dump(store, args.store)
+    with open(args.state, 'w') as f:
+        json.dump(state, f, indent=2)
+    print(f"Saved model artifacts, feature store '{args.store}' ({len(store)} rows) and '{args.state}'.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Update the feature store and model with new or changed supplier rows.")
+    parser.add_argument('input', help="CSV of supplier rows in master_dataset.csv format (enrichment columns optional).")
+    parser.add_argument('--store', default=FEATURE_STORE_FILE)
+    parser.add_argument('--state', default=STATE_FILE)
+    parser.add_argument('--rounds', type=int, default=25, help="Boosting rounds added per warm-start update.")
+    parser.add_argument('--full-refit', action='store_true', help="Refit from scratch regardless of drift.")
+    parser.add_argument('--max-churn', type=float, default=0.3, help="Max share of store rows new/changed since the last full fit.")
+    parser.add_argument('--max-label-shift', type=float, default=0.1, help="Max total variation distance of the risk_level mix.")
+    parser.add_argument('--max-psi', type=float, default=0.25, help="Max population stability index of any numeric feature.")
+    parser.add_argument('--max-added-rounds', type=int, default=150, help="Max warm-start rounds stacked on a full fit.")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run_update(args.input, args)
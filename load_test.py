@@ -0,0 +1,68 @@
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+import numpy as np
+
+# Local load generator for the prediction API. N client threads each keep one
+# keep-alive connection open and fire /predict requests back to back; the script
+# reports throughput and latency percentiles (and any non-200 responses, e.g. 503s
+# from micro-batching backpressure).
+
+SAMPLE_SUPPLIER = {
+    'name': 'Ankara Weaving Mill', 'country': 'Turkey', 'industryVertical': 'Weaving & Knitting',
+    'water_usage_m3': 90000, 'turnover_rate_percent': 18, 'workplace_accidents_last_year': 4,
+    'has_anti_corruption_policy': True, 'publishes_esg_report': False,
+    'total_emissions_kg_co2e': 115000, 'processing_type': 'Weaving',
+    'number_of_workers': '501-1000', 'sector': 'Apparel',
+    'is_iso14001_certified': True, 'is_sa8000_certified': False
+}
+
+
+def client(url, body, stop_at, latencies, statuses):
+    target = urlparse(url)
+    connection = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        try:
+            connection.request('POST', target.path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+            status = 'error'
+        latencies.append(time.perf_counter() - start)
+        statuses.append(status)
+    connection.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load-test the /predict endpoint.")
+    parser.add_argument('--url', default='http://127.0.0.1:5001/predict')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=15, help="Seconds to run.")
+    args = parser.parse_args()
+
+    body = json.dumps(SAMPLE_SUPPLIER)
+    latencies, statuses = [], []
+    start = time.perf_counter()
+    stop_at = start + args.duration
+    threads = [threading.Thread(target=client, args=(args.url, body, stop_at, latencies, statuses)) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    ok = sum(1 for status in statuses if status == 200)
+    print(f"--- Load test: {args.url}, {args.concurrency} clients, {elapsed:.1f}s ---")
+    print(f"Requests:   {len(statuses):,} ({ok:,} OK, {len(statuses) - ok:,} failed)")
+    print(f"Throughput: {len(statuses) / elapsed:,.0f} req/s")
+    if len(latencies_ms):
+        print(f"Latency:    p50 {np.percentile(latencies_ms, 50):.1f} ms | p99 {np.percentile(latencies_ms, 99):.1f} ms | max {latencies_ms.max():.1f} ms")
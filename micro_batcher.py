@@ -0,0 +1,77 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Coalesces concurrent single-row predictions into one batched call. Request threads
+# enqueue their supplier record and wait on a Future; one background thread drains the
+# queue, waiting at most max_wait_ms for a batch to fill up to max_batch_size records,
+# featurizes and scores the whole batch at once (one DataFrame, one predict_proba) and
+# hands each caller its own row of the result.
+# The queue is bounded: when it is full, submit() raises QueueFull immediately so the
+# server can shed load instead of piling up latency.
+# If scoring a batch raises, its rows are rescored one by one so an error only reaches
+# the caller whose row caused it.
+
+
+class QueueFull(Exception):
+    pass
+
+
+class MicroBatcher:
+    def __init__(self, score_batch, max_batch_size=64, max_wait_ms=5, max_queue_size=1024):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Started lazily so that pre-forking servers get one batching thread per worker process.
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                    self._thread.start()
+
+    def submit(self, item, timeout=None):
+        self._ensure_started()
+        future = Future()
+        try:
+            self.queue.put_nowait((item, future))
+        except queue.Full:
+            raise QueueFull(f"Prediction queue is full ({self.queue.maxsize} pending requests).")
+        return future.result(timeout=timeout)
+
+    def _collect_batch(self):
+        # Block for the first row, then keep collecting until the batch is full or max_wait has passed;
+        # once the wait is over, rows that are already queued are still drained without blocking.
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            items, futures = zip(*batch)
+            try:
+                results = self.score_batch(list(items))
+            except Exception:
+                self._score_each(items, futures)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+    def _score_each(self, items, futures):
+        for item, future in zip(items, futures):
+            try:
+                future.set_result(self.score_batch([item])[0])
+            except Exception as e:
+                future.set_exception(e)
@@ -0,0 +1,85 @@
+import json
+import time
+import numpy as np
+import xgboost as xgb
+from joblib import Parallel, delayed
+from sklearn.model_selection import ParameterSampler, StratifiedKFold
+
+# Randomized hyperparameter search with stratified k-fold CV for the risk classifier.
+# Every (candidate, fold) fit is an independent task spread over cores with joblib;
+# each fit uses XGBoost's 'hist' tree method with a single thread (so the pool, not
+# XGBoost, owns the cores) and early stopping on the held-out fold. The best candidate
+# is the one with the lowest mean validation mlogloss, refit with the mean number of
+# boosting rounds its folds needed.
+
+PARAM_DISTRIBUTIONS = {
+    'max_depth': [2, 3, 4, 5, 6, 8],
+    'learning_rate': [0.01, 0.03, 0.05, 0.1, 0.2, 0.3],
+    'min_child_weight': [0.5, 1, 2, 4],
+    'subsample': [0.6, 0.8, 1.0],
+    'colsample_bytree': [0.5, 0.7, 0.85, 1.0],
+    'reg_lambda': [0.1, 1, 5, 10],
+}
+MAX_ESTIMATORS = 1000
+EARLY_STOPPING_ROUNDS = 30
+
+
+def make_classifier(params, num_class, n_estimators=MAX_ESTIMATORS, early_stopping_rounds=None, random_state=42):
+    return xgb.XGBClassifier(
+        objective='multi:softprob', num_class=num_class, n_estimators=n_estimators, tree_method='hist',
+        eval_metric='mlogloss', early_stopping_rounds=early_stopping_rounds, n_jobs=1, random_state=random_state,
+        **params
+    )
+
+
+def _fit_fold(candidate_id, params, fold, X, y, train_idx, val_idx, num_class):
+    start = time.perf_counter()
+    model = make_classifier(params, num_class, early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+    model.fit(X[train_idx], y[train_idx], eval_set=[(X[val_idx], y[val_idx])], verbose=False)
+    val_logloss = model.evals_result()['validation_0']['mlogloss']
+    best_iteration = int(model.best_iteration)
+    val_accuracy = float(np.mean(model.predict(X[val_idx]) == y[val_idx]))
+    return {
+        'candidate': candidate_id, 'fold': fold, 'mlogloss': float(val_logloss[best_iteration]),
+        'accuracy': val_accuracy, 'best_iteration': best_iteration, 'seconds': time.perf_counter() - start,
+    }
+
+
+def run_search(X, y, num_class, n_iter=20, n_folds=5, n_jobs=-1, random_state=42):
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    candidates = list(ParameterSampler(PARAM_DISTRIBUTIONS, n_iter=n_iter, random_state=random_state))
+    folds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state).split(X, y))
+
+    start = time.perf_counter()
+    fold_results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(candidate_id, params, fold, X, y, train_idx, val_idx, num_class)
+        for candidate_id, params in enumerate(candidates)
+        for fold, (train_idx, val_idx) in enumerate(folds)
+    )
+    wall_seconds = time.perf_counter() - start
+
+    summaries = []
+    for candidate_id, params in enumerate(candidates):
+        results = [r for r in fold_results if r['candidate'] == candidate_id]
+        summaries.append({
+            'candidate': candidate_id,
+            'params': {k: (v.item() if hasattr(v, 'item') else v) for k, v in params.items()},
+            'mean_mlogloss': float(np.mean([r['mlogloss'] for r in results])),
+            'std_mlogloss': float(np.std([r['mlogloss'] for r in results])),
+            'mean_accuracy': float(np.mean([r['accuracy'] for r in results])),
+            'n_estimators': int(np.mean([r['best_iteration'] for r in results])) + 1,
+            'folds': results,
+        })
+    summaries.sort(key=lambda s: s['mean_mlogloss'])
+    return {
+        'n_iter': n_iter, 'n_folds': n_folds, 'n_jobs': n_jobs, 'tree_method': 'hist',
+        'early_stopping_rounds': EARLY_STOPPING_ROUNDS, 'fits': len(fold_results),
+        'wall_seconds': wall_seconds, 'fit_seconds_total': float(sum(r['seconds'] for r in fold_results)),
+        'best': summaries[0], 'candidates': summaries,
+    }
+
+
+def save_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
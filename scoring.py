@@ -0,0 +1,143 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import joblib
+import numpy as np
+import pandas as pd
+from facility_geo import add_proximity_features, load_geo_index, prepare_geo_index
+from feature_encoder import FeatureEncoder
+from features import BOOLEAN_COLS, create_features, fill_supplier_defaults
+
+# Offline scoring of whole supplier frames (master_dataset.csv schema), shared by the
+# streaming pipeline and the bulk scoring CLI. Frames are prepared exactly like step2
+# prepares training data, then encoded and scored in a single predict_proba call.
+
+MODEL_FILE = 'esg_risk_model.pkl'
+MODEL_COLUMNS_FILE = 'model_columns.pkl'
+LABEL_ENCODER_FILE = 'label_encoder.pkl'
+FEATURE_ENCODER_FILE = 'feature_encoder.pkl'
+
+ID_COLUMNS = ['supplierId', 'name', 'country']
+
+
+class ScoringArtifacts:
+    def __init__(self, model, label_encoder, feature_encoder, geo_index=None):
+        self.model = model
+        self.label_encoder = label_encoder
+        self.feature_encoder = feature_encoder
+        self.geo_index = geo_index
+        self.classes = label_encoder.classes_
+
+
+def load_artifacts(model_file=MODEL_FILE, label_encoder_file=LABEL_ENCODER_FILE,
+                   feature_encoder_file=FEATURE_ENCODER_FILE, model_columns_file=MODEL_COLUMNS_FILE):
+    model = joblib.load(model_file)
+    label_encoder = joblib.load(label_encoder_file)
+    try:
+        feature_encoder = joblib.load(feature_encoder_file)
+    except FileNotFoundError:
+        feature_encoder = FeatureEncoder(joblib.load(model_columns_file))
+    return ScoringArtifacts(model, label_encoder, feature_encoder, load_geo_index())
+
+
+def prepare_frame(df, geo_index=None):
+    fill_supplier_defaults(df)
+    # Certifications are not part of the supplier feeds; treat a missing column as "not certified".
+    for col in BOOLEAN_COLS:
+        if col not in df.columns:
+            df[col] = False
+    create_features(df, unspecified_is_missing=True)
+    add_proximity_features(df, geo_index)
+    return df
+
+
+def score_frame(df, artifacts):
+    # Returns one row per input row: the id columns present, the predicted level and per-class confidences.
+    featured_df = prepare_frame(df.copy(), artifacts.geo_index)
+    prediction_proba = artifacts.model.predict_proba(artifacts.feature_encoder.transform(featured_df))
+    result_df = df[[col for col in ID_COLUMNS if col in df.columns]].copy()
+    result_df['predicted_risk_level'] = artifacts.classes[np.argmax(prediction_proba, axis=1)]
+    for i, risk_class in enumerate(artifacts.classes):
+        result_df[f'confidence_{risk_class}'] = prediction_proba[:, i]
+    return result_df
+
+
+# --- Parallel bulk scoring ---
+# Each pool worker loads the artifacts once in its initializer and then scores whole shards.
+_worker_artifacts = None
+
+
+def set_model_threads(model, nthread):
+    # Caps XGBoost's own threading so N workers x nthread does not oversubscribe the cores.
+    model.set_params(n_jobs=nthread)
+    model.get_booster().set_param({'nthread': nthread})
+
+
+def init_worker(nthread):
+    global _worker_artifacts
+    _worker_artifacts = load_artifacts()
+    set_model_threads(_worker_artifacts.model, nthread)
+    if _worker_artifacts.geo_index is not None:
+        _worker_artifacts.geo_index.workers = nthread
+
+
+def score_shard(shard_df):
+    return score_frame(shard_df, _worker_artifacts)
+
+
+def read_shards(input_file, shard_size):
+    if input_file.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(input_file).iter_batches(batch_size=shard_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_file, chunksize=shard_size)
+
+
+class ShardWriter:
+    # Appends scored shards, in order, to a single CSV or Parquet output file.
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.parquet_writer = None
+        self.rows = 0
+
+    def write(self, shard_df):
+        if self.output_file.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(shard_df, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.output_file, table.schema)
+            self.parquet_writer.write_table(table)
+        else:
+            shard_df.to_csv(self.output_file, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        self.rows += len(shard_df)
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+
+def score_file(input_file, output_file, workers=1, shard_size=100_000, nthread=1, on_shard=None):
+    # Shards are read lazily and at most 2 x workers are in flight, so memory stays bounded;
+    # results are written back in input order. The facility cache is built here, before the
+    # pool forks, so workers only ever open it.
+    prepare_geo_index()
+    writer = ShardWriter(output_file)
+    pending = deque()
+
+    def write_next():
+        writer.write(pending.popleft().result())
+        if on_shard:
+            on_shard(writer.rows)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(nthread,)) as executor:
+            for shard_df in read_shards(input_file, shard_size):
+                pending.append(executor.submit(score_shard, shard_df))
+                if len(pending) >= 2 * workers:
+                    write_next()
+            while pending:
+                write_next()
+    finally:
+        writer.close()
+    return writer.rows
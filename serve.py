@@ -0,0 +1,69 @@
+import argparse
+import os
+
+# Production entry point for the prediction API, replacing the Flask debug server.
+#
+#   gunicorn (default): pre-forked worker processes, each importing api.py and so loading
+#                       the model once, serving requests on a pool of threads.
+#   waitress:           a single multi-threaded process, for platforms without fork().
+#
+# Micro-batching is configured through environment variables read by api.py at import
+# time, so every worker process gets its own batching thread.
+#
+# The facility cache and spatial index are built once here, in the parent, before any
+# worker starts: workers only open the finished cache (and, under gunicorn, inherit the
+# parent's KD-trees), so they never race to write it.
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class GunicornApp(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{args.host}:{args.port}')
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', args.threads)
+            self.cfg.set('backlog', args.backlog)
+            self.cfg.set('timeout', 30)
+
+        def load(self):
+            # Imported inside the worker (no preload), so each worker loads its own model copy.
+            from api import app
+            return app
+
+    GunicornApp().run()
+
+
+def run_waitress(args):
+    from waitress import serve
+    from api import app
+    serve(app, host=args.host, port=args.port, threads=args.threads, backlog=args.backlog)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the ESG risk prediction API in production mode.")
+    parser.add_argument('--server', choices=['gunicorn', 'waitress'], default='gunicorn')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes (gunicorn only).")
+    parser.add_argument('--threads', type=int, default=8, help="Request threads per worker.")
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--no-micro-batch', action='store_true', help="Score every /predict call on its own.")
+    parser.add_argument('--batch-max-size', type=int, default=64)
+    parser.add_argument('--batch-max-wait-ms', type=float, default=5)
+    parser.add_argument('--batch-queue-size', type=int, default=1024, help="Pending rows per worker before returning 503.")
+    args = parser.parse_args()
+
+    os.environ['ESG_MICRO_BATCH'] = '0' if args.no_micro_batch else '1'
+    os.environ['ESG_BATCH_MAX_SIZE'] = str(args.batch_max_size)
+    os.environ['ESG_BATCH_MAX_WAIT_MS'] = str(args.batch_max_wait_ms)
+    os.environ['ESG_BATCH_QUEUE_SIZE'] = str(args.batch_queue_size)
+
+    from facility_geo import prepare_geo_index
+    prepare_geo_index()
+
+    if args.server == 'gunicorn':
+        run_gunicorn(args)
+    else:
+        run_waitress(args)
@@ -0,0 +1,104 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Minimal, dependency-free Prometheus metrics for the prediction service: labelled
+# counters and histograms kept in process memory and rendered in the Prometheus text
+# exposition format by render(). Under a pre-forking server each worker exposes its
+# own series; scrape every worker or aggregate with a 'worker' label downstream.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (128, 256, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 512, 2048, 10000, 50000)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{value}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._series[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", bound)])} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {total}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class Gauge:
+    # Read at scrape time from a callback, e.g. the prediction cache's counters.
+    def __init__(self, name, documentation, read, metric_type='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.metric_type = metric_type
+
+    def render(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}', f'{self.name} {self.read()}']
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
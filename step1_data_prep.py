@@ -1,5 +1,9 @@
 import pandas as pd
 import io
+from emissions import EmissionFactorRegistry, calculate_emissions
+from facility_store import FacilityStore, ensure_cache
+from supplier_matcher import SupplierMatcher, resolve_facility_rows
+from table_schema import SUPPLIER_SCHEMA, load_table, save_table
 
 print("--- Step 1 (Final & Expanded): Data Consolidation & Preparation ---")
 
@@ -77,31 +81,40 @@ Natural Gas,kg CO2e/m³,2.02
 Diesel Fuel,kg CO2e/Liter,2.68
 """
 
-suppliers_df = pd.read_csv(io.StringIO(suppliers_data))
+suppliers_df = load_table(io.StringIO(suppliers_data), SUPPLIER_SCHEMA)
 activity_df = pd.read_csv(io.StringIO(activity_data))
 factors_df = pd.read_csv(io.StringIO(emission_factors_data))
-activity_df['source'] = activity_df['dataType'].apply(lambda x: 'Grid' if 'Electric' in x else x)
 
 print("Calculating emissions for internal suppliers...")
-emissions_df = pd.merge(activity_df, factors_df, on='source', how='left')
-emissions_df['total_emissions_kg_co2e'] = emissions_df['value'] * emissions_df['factor']
-emissions_summary_df = emissions_df.groupby('supplierId')['total_emissions_kg_co2e'].sum().reset_index()
-internal_master_df = pd.merge(suppliers_df, emissions_summary_df, on='supplierId', how='left').fillna(0)
+# Units are normalized to each factor's unit and totals summed per supplier (see emissions.py).
+# Factor rows may carry a 'country' column for per-country grid factors; this table has none.
+factor_registry = EmissionFactorRegistry.from_frame(factors_df)
+emissions_summary_df, unmatched = calculate_emissions(
+    activity_df, factor_registry, suppliers_df.set_index('supplierId')['country'], return_unmatched=True)
+if unmatched.any():
+    print(f"Warning: {int(unmatched.sum())} activity rows had no matching emission factor and were counted as 0.")
+internal_master_df = pd.merge(suppliers_df, emissions_summary_df, on='supplierId', how='left').fillna({'total_emissions_kg_co2e': 0})
 print(f"Processed {len(internal_master_df)} internal supplier records.")
 
 REAL_DATA_FILE = 'facilities-2.csv'
+FACILITY_CACHE_DIR = 'facilities_cache'
 try:
+    # The facilities export is parsed once into a memory-mapped cache (rebuilt only when the CSV changes);
+    # each supplier is then resolved with an O(1) hashed (name, country) lookup instead of a full merge.
     print(f"Loading real-world data from '{REAL_DATA_FILE}'...")
-    real_df = pd.read_csv(REAL_DATA_FILE, low_memory=False, usecols=['name', 'country_name', 'number_of_workers', 'sector', 'processing_type', 'lat', 'lng'])
-    real_df.rename(columns={'country_name': 'country'}, inplace=True)
-    master_df = pd.merge(internal_master_df, real_df, on=['name', 'country'], how='left')
-    master_df = master_df.drop_duplicates(subset=['supplierId']).reset_index(drop=True)
-    print("Enrichment complete.")
+    if ensure_cache(REAL_DATA_FILE, FACILITY_CACHE_DIR):
+        print(f"Facility cache rebuilt in '{FACILITY_CACHE_DIR}'.")
+    facility_store = FacilityStore(FACILITY_CACHE_DIR)
+    # Suppliers without an exact hit go through the fuzzy matcher (normalized names, blocked by country).
+    matcher = SupplierMatcher.from_store(facility_store)
+    facility_rows, exact_matches, fuzzy_match_count = resolve_facility_rows(facility_store, internal_master_df, matcher)
+    master_df = facility_store.enrich(internal_master_df, rows=facility_rows)
+    print(f"Enrichment complete: {exact_matches} exact and {fuzzy_match_count} fuzzy facility matches.")
 except FileNotFoundError:
     print(f"Error: '{REAL_DATA_FILE}' not found. Using internal data only.")
     master_df = internal_master_df
 
 OUTPUT_FILE = 'master_dataset.csv'
-master_df.to_csv(OUTPUT_FILE, index=False)
+save_table(master_df, OUTPUT_FILE, SUPPLIER_SCHEMA)
 print(f"Consolidated data saved to '{OUTPUT_FILE}'.")
 print("\n--- Step 1 Complete ---")
\ No newline at end of file
@@ -1,3 +1,4 @@
+import argparse
 import pandas as pd
 import joblib
 import warnings
@@ -5,22 +6,35 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import classification_report, accuracy_score
 import xgboost as xgb
+import numpy as np
+from feature_encoder import FeatureEncoder, CATEGORICAL_COLS
+from fast_inference import export_model, NATIVE_MODEL_FILE, COMPILED_MODEL_FILE, SCHEMA_FILE
+from model_search import run_search, save_report, make_classifier
+from table_schema import SUPPLIER_SCHEMA, load_table, memory_mb
 
 warnings.filterwarnings('ignore')
 
+parser = argparse.ArgumentParser(description="Train and evaluate the ESG risk classifier.")
+parser.add_argument('--search', action='store_true',
+                    help="Tune hyperparameters with a parallel randomized search and stratified k-fold CV before the final fit.")
+parser.add_argument('--n-iter', type=int, default=20, help="Parameter candidates to evaluate in --search mode.")
+parser.add_argument('--folds', type=int, default=5, help="Stratified CV folds in --search mode.")
+parser.add_argument('--jobs', type=int, default=-1, help="Parallel fits in --search mode (-1 = all cores).")
+parser.add_argument('--report', default='search_report.json', help="Where --search mode writes its JSON report.")
+args = parser.parse_args()
+
 print("--- Step 3 (Advanced): Model Training & Evaluation ---")
 
 INPUT_FILE = 'featured_dataset.csv'
 try:
-    featured_df = pd.read_csv(INPUT_FILE)
-    print(f"Loaded '{INPUT_FILE}' with {len(featured_df)} records.")
+    featured_df = load_table(INPUT_FILE, SUPPLIER_SCHEMA)
+    print(f"Loaded '{INPUT_FILE}' with {len(featured_df)} records ({memory_mb(featured_df):.1f} MB in memory).")
 except FileNotFoundError:
     print(f"Error: '{INPUT_FILE}' not found. Please run Step 2 first.")
     exit()
 
 print("Preparing data for the model...")
-categorical_cols = ['country', 'industryVertical', 'processing_type', 'sector', 'industry_description']
-model_df = pd.get_dummies(featured_df, columns=categorical_cols, drop_first=True)
+model_df = pd.get_dummies(featured_df, columns=CATEGORICAL_COLS, drop_first=True)
 
 target = 'risk_level'
 y = model_df[target]
@@ -30,6 +44,13 @@ if target in X.columns:
 X = X.drop(columns=[col for col in ['lat', 'lng'] if col in X.columns], errors='ignore')
 joblib.dump(X.columns, 'model_columns.pkl')
 
+# Fit the serving-time encoder and check it reproduces the pandas encoding exactly.
+feature_encoder = FeatureEncoder(X.columns)
+if not np.array_equal(feature_encoder.transform(featured_df), X.to_numpy(dtype=np.float32), equal_nan=True):
+    raise RuntimeError("FeatureEncoder output does not match the pandas one-hot encoding.")
+joblib.dump(feature_encoder, 'feature_encoder.pkl')
+print(f"Feature encoder fitted for {feature_encoder.n_features} columns and saved to 'feature_encoder.pkl'.")
+
 print(f"Splitting data into training ({int((1-0.25)*100)}%) and testing ({int(0.25*100)}%) sets.")
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.25, random_state=42, stratify=y)
 
@@ -41,11 +62,24 @@ y_test_encoded = le.transform(y_test)
 joblib.dump(le, 'label_encoder.pkl')
 num_classes = len(le.classes_)
 
+if args.search:
+    # CV runs on the training split only; the test split stays unseen for the final evaluation.
+    print(f"\n--- Hyperparameter Search ({args.n_iter} candidates x {args.folds}-fold stratified CV) ---")
+    report = run_search(X_train, y_train_encoded, num_classes, n_iter=args.n_iter, n_folds=args.folds, n_jobs=args.jobs)
+    best = report['best']
+    print(f"{report['fits']} fits in {report['wall_seconds']:.1f}s wall ({report['fit_seconds_total']:.1f}s of fitting).")
+    print(f"Best CV mlogloss {best['mean_mlogloss']:.4f} +/- {best['std_mlogloss']:.4f} "
+          f"(accuracy {best['mean_accuracy']:.2f}) with n_estimators={best['n_estimators']}, params={best['params']}")
+
 print("\n--- Training the XGBoost Classifier ---")
-xgb_model = xgb.XGBClassifier(
-    objective='multi:softprob', num_class=num_classes, n_estimators=150,
-    learning_rate=0.1, use_label_encoder=False, eval_metric='mlogloss', random_state=42
-)
+if args.search:
+    xgb_model = make_classifier(best['params'], num_classes, n_estimators=best['n_estimators'])
+    xgb_model.set_params(n_jobs=None)
+else:
+    xgb_model = xgb.XGBClassifier(
+        objective='multi:softprob', num_class=num_classes, n_estimators=150,
+        learning_rate=0.1, use_label_encoder=False, eval_metric='mlogloss', random_state=42
+    )
 xgb_model.fit(X_train, y_train_encoded)
 print("Model training complete.")
 
@@ -57,7 +91,17 @@ print(f"\nModel Accuracy on Test Data: {accuracy_score(y_test, y_pred):.2f}")
 print("\nClassification Report:")
 print(classification_report(y_test, y_pred, labels=['Low', 'Medium', 'High'], zero_division=0))
 
+if args.search:
+    report['test_accuracy'] = float(accuracy_score(y_test, y_pred))
+    save_report(report, args.report)
+    print(f"Search report saved to '{args.report}'.")
+
 print("\n--- Saving the final trained model ---")
 joblib.dump(xgb_model, 'esg_risk_model.pkl')
 print("Model successfully saved to 'esg_risk_model.pkl'.")
+
+# Native booster + NumPy-compiled trees for the lean inference path (fast_inference.py).
+compiled_model = export_model(xgb_model, X.columns, le.classes_)
+max_diff = np.abs(compiled_model.predict_proba(X_test.to_numpy(dtype=np.float32)) - xgb_model.predict_proba(X_test)).max()
+print(f"Exported '{NATIVE_MODEL_FILE}', '{COMPILED_MODEL_FILE}' and '{SCHEMA_FILE}' (max probability difference: {max_diff:.1e}).")
 print("\n--- Step 3 Complete ---")
\ No newline at end of file
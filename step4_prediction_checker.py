@@ -1,22 +1,21 @@
+import argparse
+import os
+import time
 import pandas as pd
-import joblib
 import warnings
+from facility_geo import add_proximity_features
+from features import create_features
+from scoring import load_artifacts, score_file
+
+# Without arguments this checks the three hand-written suppliers below. Given a CSV or
+# Parquet file of suppliers (master_dataset.csv schema) it becomes a bulk scorer: the file
+# is split into shards that are featurized and scored in a process pool, where every
+# worker loads the model files once, and the results are merged into one output file.
 
 # --- Setup ---
 warnings.filterwarnings('ignore')
-print("--- Advanced AI Model Checker for Low, Medium, and High Risk ---")
-
-# --- 1. Load the Saved Model and Helper Files ---
-try:
-    model = joblib.load('esg_risk_model.pkl')
-    model_columns = joblib.load('model_columns.pkl')
-    label_encoder = joblib.load('label_encoder.pkl')
-    print("✅ Model and helper files loaded successfully.\n")
-except FileNotFoundError:
-    print("❌ Error: Model files not found. Please run 'step2_and_3_train_and_tune.py' first.")
-    exit()
 
-# --- 2. Define Sample Data for Each Risk Category ---
+# --- 1. Define Sample Data for Each Risk Category ---
 
 # Designed to be clearly LOW risk
 low_risk_supplier = {
@@ -50,72 +49,66 @@ high_risk_supplier = {
 
 test_cases = [low_risk_supplier, medium_risk_supplier, high_risk_supplier]
 
-# --- 3. Recreate the Feature Engineering Pipeline ---
-# This function MUST be identical to the one in your training and API scripts.
-def create_features(df):
-    GEOPOLITICAL_RISK = {'India': 3, 'China': 4, 'Vietnam': 2, 'Bangladesh': 4, 'USA': 1, 'Turkey': 3, 'Pakistan': 5, 'Brazil': 3, 'Morocco': 3}
-    df['geopolitical_risk'] = df['country'].map(GEOPOLITICAL_RISK).fillna(3)
-
-    df['industry_description'] = df.apply(
-        lambda row: row.get('processing_type') if pd.notna(row.get('processing_type')) else row.get('industryVertical'),
-        axis=1
-    )
-    INDUSTRY_RISK = {'Dyeing': 5, 'Printing': 4, 'Finishing': 5, 'Spinning': 4, 'Weaving': 3, 'Manufacturing': 3, 'Logistics': 1, 'Packaging': 1, 'Unspecified': 2}
-    def map_industry_risk(desc):
-        for risk_word, score in INDUSTRY_RISK.items():
-            if risk_word.lower() in str(desc).lower(): return score
-        return 2
-    df['industry_risk'] = df['industry_description'].apply(map_industry_risk)
-
-    def parse_workers(worker_str):
-        worker_str = str(worker_str)
-        if '5001+' in worker_str: return 7500
-        if '-' in worker_str:
-            try:
-                low, high = map(int, worker_str.split('-'))
-                return (low + high) / 2
-            except: return 0
-        return 0
-    df['worker_count_avg'] = df['number_of_workers'].apply(parse_workers)
-    df['emission_intensity'] = df.apply(
-        lambda row: row['total_emissions_kg_co2e'] / row['worker_count_avg'] if row['worker_count_avg'] > 0 else 0,
-        axis=1
-    )
-    
-    df['is_iso14001_certified'] = df['is_iso14001_certified'].astype(bool)
-    df['is_sa8000_certified'] = df['is_sa8000_certified'].astype(bool)
-    df['has_anti_corruption_policy'] = df['has_anti_corruption_policy'].astype(bool)
-    df['publishes_esg_report'] = df['publishes_esg_report'].astype(bool)
-    
-    return df
-
-# --- 4. Process and Predict for Each Case ---
-for supplier_data in test_cases:
-    print(f"\n--- Testing Supplier: {supplier_data['name']} ---")
-    
-    # Convert dict to DataFrame
-    new_df = pd.DataFrame([supplier_data])
-    
-    # Apply feature engineering
-    featured_df = create_features(new_df)
-    
-    # One-hot encode categorical columns
-    categorical_cols = ['country', 'industryVertical', 'processing_type', 'sector', 'industry_description']
-    encoded_df = pd.get_dummies(featured_df, columns=categorical_cols, drop_first=True)
-    
-    # Align columns to match the model's training data
-    final_df = encoded_df.reindex(columns=model_columns, fill_value=0)
-    
-    # Make prediction
-    prediction_encoded = model.predict(final_df)
-    prediction_proba = model.predict_proba(final_df)
-    prediction_label = label_encoder.inverse_transform(prediction_encoded)[0]
-    
-    # Display results
-    print(f"✅ PREDICTION:   {prediction_label.upper()}")
-    
-    confidence_scores = pd.DataFrame(prediction_proba, columns=label_encoder.classes_)
-    print("Confidence Scores:")
-    for risk_class in confidence_scores.columns:
-        score = confidence_scores[risk_class].iloc[0]
-        print(f"  - {risk_class}: {score:.2%}")
\ No newline at end of file
+# --- 2. Feature Engineering ---
+# create_features comes from features.py, shared with step2 and the API.
+
+# --- 3. Process and Predict for Each Case ---
+def run_sample_checks():
+    print("--- Advanced AI Model Checker for Low, Medium, and High Risk ---")
+    try:
+        artifacts = load_artifacts()
+        print("✅ Model and helper files loaded successfully.\n")
+    except FileNotFoundError:
+        print("❌ Error: Model files not found. Please run 'step3_model_training.py' first.")
+        exit()
+    model, label_encoder, feature_encoder = artifacts.model, artifacts.label_encoder, artifacts.feature_encoder
+
+    for supplier_data in test_cases:
+        print(f"\n--- Testing Supplier: {supplier_data['name']} ---")
+
+        # Convert dict to DataFrame
+        new_df = pd.DataFrame([supplier_data])
+
+        # Apply feature engineering
+        featured_df = add_proximity_features(create_features(new_df), artifacts.geo_index)
+
+        # Encode into the model's column layout with the fitted encoder
+        model_input = feature_encoder.transform(featured_df)
+
+        # Make prediction
+        prediction_proba = model.predict_proba(model_input)
+        prediction_label = label_encoder.classes_[prediction_proba[0].argmax()]
+
+        # Display results
+        print(f"✅ PREDICTION:   {prediction_label.upper()}")
+
+        confidence_scores = pd.DataFrame(prediction_proba, columns=label_encoder.classes_)
+        print("Confidence Scores:")
+        for risk_class in confidence_scores.columns:
+            score = confidence_scores[risk_class].iloc[0]
+            print(f"  - {risk_class}: {score:.2%}")
+
+
+# --- 4. Bulk Scoring ---
+def run_bulk_scoring(args):
+    print(f"--- Bulk Scoring: {args.input} -> {args.output} ({args.workers} workers x {args.nthread} threads) ---")
+    start = time.perf_counter()
+    report = lambda rows: print(f"  {rows:,} rows scored ({rows / (time.perf_counter() - start):,.0f} rows/s)")
+    rows = score_file(args.input, args.output, workers=args.workers, shard_size=args.shard_size,
+                      nthread=args.nthread, on_shard=report)
+    print(f"✅ Scored {rows:,} suppliers in {time.perf_counter() - start:.1f}s; results saved to '{args.output}'.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check sample suppliers, or bulk-score a supplier file in parallel.")
+    parser.add_argument('input', nargs='?', help="CSV or Parquet of suppliers to score. Omit to run the sample checks.")
+    parser.add_argument('-o', '--output', default='predictions.csv', help="Merged output file (.csv or .parquet).")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes.")
+    parser.add_argument('--shard-size', type=int, default=100_000, help="Rows per shard.")
+    parser.add_argument('--nthread', type=int, default=1, help="XGBoost threads per worker.")
+    args = parser.parse_args()
+
+    if args.input:
+        run_bulk_scoring(args)
+    else:
+        run_sample_checks()
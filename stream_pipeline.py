@@ -0,0 +1,65 @@
+import argparse
+import os
+import time
+import warnings
+import pandas as pd
+from facility_geo import prepare_geo_index
+from facility_store import FacilityStore, ENRICHMENT_COLUMNS, SOURCE_FILE, DEFAULT_CACHE_DIR
+from scoring import load_artifacts, score_frame
+from supplier_matcher import SupplierMatcher, resolve_facility_rows, DEFAULT_MIN_CONFIDENCE
+
+# Streaming mode for steps 1 -> 2 -> scoring. The supplier file is read in bounded
+# chunks; each chunk is enriched from the memory-mapped facility cache, featurized
+# and scored, and its predictions are appended to the output before the next chunk
+# is read. Nothing proportional to the input size is ever held in memory.
+#
+# Input rows follow the internal supplier schema from step1 (supplierId, name, country,
+# industryVertical, ..., total_emissions_kg_co2e). Files that already carry the facility
+# columns (e.g. master_dataset.csv) are scored without re-enrichment.
+
+warnings.filterwarnings('ignore')
+
+DEFAULT_CHUNKSIZE = 50_000
+
+
+def run_pipeline(input_file, output_file, chunksize=DEFAULT_CHUNKSIZE, enrich=True, fuzzy=False,
+                 min_confidence=DEFAULT_MIN_CONFIDENCE, facilities_file=SOURCE_FILE, cache_dir=DEFAULT_CACHE_DIR):
+    prepare_geo_index(facilities_file, cache_dir)
+    artifacts = load_artifacts()
+    store = FacilityStore(cache_dir) if enrich else None
+    matcher = SupplierMatcher.from_store(store, min_confidence=min_confidence) if enrich and fuzzy else None
+
+    if os.path.exists(output_file):
+        os.remove(output_file)
+    total_rows = 0
+    start = time.perf_counter()
+    for chunk_number, chunk_df in enumerate(pd.read_csv(input_file, chunksize=chunksize), start=1):
+        if store is not None and not set(ENRICHMENT_COLUMNS) <= set(chunk_df.columns):
+            facility_rows, _, _ = resolve_facility_rows(store, chunk_df, matcher)
+            chunk_df = store.enrich(chunk_df, rows=facility_rows)
+
+        predictions_df = score_frame(chunk_df, artifacts)
+        predictions_df.to_csv(output_file, mode='a', header=chunk_number == 1, index=False)
+
+        total_rows += len(chunk_df)
+        elapsed = time.perf_counter() - start
+        print(f"Chunk {chunk_number}: {total_rows:,} rows scored ({total_rows / elapsed:,.0f} rows/s).")
+    return total_rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stream a supplier CSV through enrichment, feature engineering and scoring.")
+    parser.add_argument('input', help="Supplier CSV (step1 schema, including total_emissions_kg_co2e).")
+    parser.add_argument('output', help="Predictions CSV, written incrementally chunk by chunk.")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Rows per chunk; bounds peak memory.")
+    parser.add_argument('--no-enrich', action='store_true', help="Skip facility enrichment.")
+    parser.add_argument('--fuzzy', action='store_true', help="Fuzzy-match suppliers without an exact facility hit.")
+    parser.add_argument('--min-confidence', type=float, default=DEFAULT_MIN_CONFIDENCE)
+    parser.add_argument('--facilities', default=SOURCE_FILE)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    print("--- Streaming Pipeline: Enrichment -> Features -> Scoring ---")
+    rows = run_pipeline(args.input, args.output, args.chunksize, enrich=not args.no_enrich, fuzzy=args.fuzzy,
+                        min_confidence=args.min_confidence, facilities_file=args.facilities, cache_dir=args.cache_dir)
+    print(f"Scored {rows:,} suppliers; predictions saved to '{args.output}'.")
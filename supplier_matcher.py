@@ -0,0 +1,215 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from sklearn.preprocessing import normalize
+
+# Fuzzy supplier -> facility matching. Names are normalized, candidates are blocked by
+# country code, and within each block a character-trigram TF-IDF index generates a
+# few candidates per supplier from rare n-grams only; those are then rescored with
+# the full trigram cosine similarity, which is reported as the match confidence.
+# Blocks are independent, so they can be spread across processes.
+
+LEGAL_SUFFIXES = ['ltd', 'limited', 'pvt', 'private', 'p', 'inc', 'incorporated', 'llc', 'plc', 'co', 'company',
+                  'corp', 'corporation', 'pt', 'sarl', 'gmbh', 'srl', 'spa', 'bv', 'ag', 'jsc', 'llp']
+# Only a run of legal words at the end of the name ("pvt ltd"), so "Co" in "Co Textiles" stays.
+LEGAL_SUFFIX_PATTERN = r'(?:(?:^|\s+)(?:' + '|'.join(LEGAL_SUFFIXES) + r'))+\s*$'
+
+# Supplier country spellings that differ from the facilities export's country_name
+# ("United States", "Türkiye", ...), keyed casefolded. ISO alpha-2 codes are accepted too.
+COUNTRY_ALIASES = {
+    'usa': 'US', 'us': 'US', 'u s a': 'US', 'united states of america': 'US', 'america': 'US',
+    'turkey': 'TR', 'turkiye': 'TR',
+    'uk': 'GB', 'united kingdom': 'GB', 'great britain': 'GB', 'england': 'GB',
+    'viet nam': 'VN', 'south korea': 'KR', 'korea': 'KR', 'republic of korea': 'KR',
+    'china': 'CN', "people's republic of china": 'CN', 'prc': 'CN', 'hong kong': 'HK',
+    'brazil': 'BR', 'morocco': 'MA', 'egypt': 'EG', 'mexico': 'MX', 'sri lanka': 'LK', 'cambodia': 'KH',
+    'myanmar': 'MM', 'burma': 'MM', 'ethiopia': 'ET', 'tunisia': 'TN', 'portugal': 'PT', 'spain': 'ES',
+    'czech republic': 'CZ', 'czechia': 'CZ', 'russia': 'RU', 'taiwan': 'TW', 'uae': 'AE', 'united arab emirates': 'AE',
+    'drc': 'CD', 'dr congo': 'CD', 'democratic republic of the congo': 'CD',
+}
+
+DEFAULT_MIN_CONFIDENCE = 0.8
+CANDIDATES_PER_SUPPLIER = 5
+# In large blocks, n-grams shared by more than this share of facilities ("tex", "ile")
+# are too common to narrow anything down, so they are left out of candidate generation.
+CANDIDATE_MAX_DF = 0.05
+MIN_BLOCK_FOR_PRUNING = 1000
+SUPPLIER_CHUNK = 2000
+
+NO_MATCH = -1
+
+
+def normalize_names(names):
+    names = pd.Series(names, dtype=object).fillna('').astype(str)
+    cleaned = (names.str.casefold()
+               .str.replace('&', ' and ', regex=False)
+               .str.replace(r'[^\w\s]', ' ', regex=True)
+               .str.replace(LEGAL_SUFFIX_PATTERN, ' ', regex=True)
+               .str.replace(r'\s+', ' ', regex=True)
+               .str.strip())
+    # A name made only of legal words ("Pvt Ltd") keeps its casefolded form rather than becoming empty.
+    return cleaned.where(cleaned != '', names.str.casefold().str.strip()).to_numpy(dtype=object)
+
+
+def _top_candidates(similarity, k):
+    similarity = similarity.tocsr()
+    candidates = np.full((similarity.shape[0], k), NO_MATCH, dtype=np.int64)
+    for i in range(similarity.shape[0]):
+        start, end = similarity.indptr[i], similarity.indptr[i + 1]
+        if start == end:
+            continue
+        scores = similarity.data[start:end]
+        top = np.argsort(-scores)[:k]
+        candidates[i, :len(top)] = similarity.indices[start:end][top]
+    return candidates
+
+
+def match_block(supplier_names, facility_names):
+    # Returns (best facility position within the block, confidence) for each supplier.
+    n_suppliers = len(supplier_names)
+    best = np.full(n_suppliers, NO_MATCH, dtype=np.int64)
+    confidence = np.zeros(n_suppliers, dtype=np.float32)
+    if n_suppliers == 0 or len(facility_names) == 0:
+        return best, confidence
+
+    # Analyze each name into trigrams once; both the full and the pruned vectors derive from these counts.
+    counter = CountVectorizer(analyzer='char_wb', ngram_range=(3, 3), dtype=np.float32)
+    facility_counts = counter.fit_transform(facility_names)
+    supplier_counts = counter.transform(supplier_names)
+    tfidf = TfidfTransformer().fit(facility_counts)
+    facility_full = tfidf.transform(facility_counts)
+    supplier_full = tfidf.transform(supplier_counts)
+
+    facility_candidates, supplier_candidates = facility_full, supplier_full
+    if len(facility_names) >= MIN_BLOCK_FOR_PRUNING:
+        document_frequency = np.bincount(facility_counts.indices, minlength=facility_counts.shape[1])
+        rare = np.flatnonzero(document_frequency <= CANDIDATE_MAX_DF * len(facility_names))
+        if len(rare):
+            facility_candidates = normalize(facility_full[:, rare])
+            supplier_candidates = normalize(supplier_full[:, rare])
+
+    facility_candidates_t = facility_candidates.T.tocsr()
+    for start in range(0, n_suppliers, SUPPLIER_CHUNK):
+        stop = min(start + SUPPLIER_CHUNK, n_suppliers)
+        candidates = _top_candidates(supplier_candidates[start:stop] @ facility_candidates_t, CANDIDATES_PER_SUPPLIER)
+        if facility_candidates is not facility_full:
+            # Names built only from common n-grams found nothing in the pruned index; retry just those with full vectors.
+            missing = np.flatnonzero(candidates[:, 0] == NO_MATCH)
+            if len(missing):
+                candidates[missing] = _top_candidates(supplier_full[start + missing] @ facility_full.T.tocsr(), CANDIDATES_PER_SUPPLIER)
+
+        # Rescore each (supplier, candidate) pair with the full trigram cosine similarity.
+        rows = np.repeat(np.arange(start, stop), CANDIDATES_PER_SUPPLIER)
+        cols = candidates.ravel()
+        valid = cols != NO_MATCH
+        scores = np.full(len(cols), -1.0, dtype=np.float32)
+        if valid.any():
+            scores[valid] = np.asarray(supplier_full[rows[valid]].multiply(facility_full[cols[valid]]).sum(axis=1)).ravel()
+        scores = scores.reshape(-1, CANDIDATES_PER_SUPPLIER)
+        pick = scores.argmax(axis=1)
+        chunk_best = candidates[np.arange(stop - start), pick]
+        chunk_scores = scores[np.arange(stop - start), pick]
+        best[start:stop] = chunk_best
+        confidence[start:stop] = np.clip(chunk_scores, 0, 1)
+    return best, confidence
+
+
+def _match_block_task(args):
+    block_key, supplier_positions, supplier_names, facility_rows, facility_names = args
+    best, confidence = match_block(supplier_names, facility_names)
+    matched_rows = np.where(best != NO_MATCH, facility_rows[np.maximum(best, 0)], NO_MATCH)
+    return supplier_positions, matched_rows, confidence
+
+
+class SupplierMatcher:
+    def __init__(self, facility_names, facility_country_codes, min_confidence=DEFAULT_MIN_CONFIDENCE, n_jobs=1):
+        self.min_confidence = min_confidence
+        self.n_jobs = n_jobs
+        self.facility_names = normalize_names(facility_names)
+        codes = pd.Series(facility_country_codes, dtype=object).fillna('').astype(str).str.upper().to_numpy()
+        # Blocking index: country code -> facility row numbers in that country.
+        self.blocks = pd.Series(np.arange(len(codes))).groupby(codes).apply(lambda rows: rows.to_numpy()).to_dict()
+
+    @classmethod
+    def from_store(cls, store, **kwargs):
+        return cls(store.names(), store.text_column('country_code'), **kwargs)
+
+    def match(self, supplier_names, supplier_country_codes):
+        # Returns a frame aligned with the input: facility_row (-1 if unmatched) and confidence.
+        names = normalize_names(supplier_names)
+        codes = pd.Series(supplier_country_codes, dtype=object).fillna('').astype(str).str.upper().to_numpy()
+        facility_row = np.full(len(names), NO_MATCH, dtype=np.int64)
+        confidence = np.zeros(len(names), dtype=np.float32)
+
+        tasks = []
+        for code, positions in pd.Series(np.arange(len(codes))).groupby(codes):
+            facility_rows = self.blocks.get(code)
+            if facility_rows is None:
+                continue
+            positions = positions.to_numpy()
+            tasks.append((code, positions, names[positions], facility_rows, self.facility_names[facility_rows]))
+        # Largest blocks first so the pool is not left waiting on one big country at the end.
+        tasks.sort(key=lambda task: len(task[1]) * len(task[3]), reverse=True)
+
+        if self.n_jobs == 1 or len(tasks) <= 1:
+            results = list(map(_match_block_task, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=self.n_jobs if self.n_jobs > 0 else None) as executor:
+                results = list(executor.map(_match_block_task, tasks))
+        for positions, rows, scores in results:
+            facility_row[positions] = rows
+            confidence[positions] = scores
+
+        accepted = confidence >= self.min_confidence
+        return pd.DataFrame({
+            'facility_row': np.where(accepted, facility_row, NO_MATCH),
+            'confidence': confidence,
+        })
+
+
+def country_codes_for(store, countries):
+    # Suppliers carry country names; facilities are blocked by ISO code. Names from the export
+    # win, then COUNTRY_ALIASES, then the value itself as an ISO code.
+    store_codes = pd.Series(store.text_column('country_code'), dtype=object)
+    name_to_code = {code.casefold(): code for code in store_codes.dropna().unique()}
+    name_to_code.update(COUNTRY_ALIASES)
+    name_to_code.update(zip(pd.Series(store.text_column('country')).str.casefold(), store_codes))
+    keys = pd.Series(countries, dtype=object).astype(str).str.replace('.', ' ', regex=False).str.strip().str.casefold()
+    keys = keys.str.replace(r'\s+', ' ', regex=True)
+    return keys.map(name_to_code).to_numpy(dtype=object)
+
+
+def resolve_facility_rows(store, suppliers_df, matcher=None):
+    # Exact (normalized name, country) hits from the store first; the rest go through the fuzzy matcher.
+    facility_rows = store.lookup_many(suppliers_df['name'], suppliers_df['country'])
+    exact_matches = int((facility_rows != NO_MATCH).sum())
+    unmatched = facility_rows == NO_MATCH
+    if matcher is not None and unmatched.any():
+        unmatched_df = suppliers_df[unmatched]
+        fuzzy_matches = matcher.match(unmatched_df['name'], country_codes_for(store, unmatched_df['country']))
+        facility_rows[unmatched] = fuzzy_matches['facility_row'].to_numpy()
+    fuzzy_matches = int((facility_rows != NO_MATCH).sum()) - exact_matches
+    return facility_rows, exact_matches, fuzzy_matches
+
+
+if __name__ == '__main__':
+    from facility_store import FacilityStore
+
+    parser = argparse.ArgumentParser(description="Fuzzy-match a supplier CSV (name, country) against the facility cache.")
+    parser.add_argument('input', help="CSV with at least 'name' and 'country' columns.")
+    parser.add_argument('output', help="CSV to write, with facility_row, facility_name and match_confidence added.")
+    parser.add_argument('--min-confidence', type=float, default=DEFAULT_MIN_CONFIDENCE)
+    parser.add_argument('--jobs', type=int, default=1, help="Processes to spread country blocks over (0 = all cores).")
+    args = parser.parse_args()
+
+    store = FacilityStore.open()
+    suppliers_df = pd.read_csv(args.input)
+    matcher = SupplierMatcher.from_store(store, min_confidence=args.min_confidence, n_jobs=args.jobs)
+    matches = matcher.match(suppliers_df['name'], country_codes_for(store, suppliers_df['country']))
+    suppliers_df['facility_row'] = matches['facility_row'].to_numpy()
+    suppliers_df['facility_name'] = [store.name(row) if row != NO_MATCH else None for row in suppliers_df['facility_row']]
+    suppliers_df['match_confidence'] = matches['confidence'].to_numpy()
+    suppliers_df.to_csv(args.output, index=False)
+    print(f"Matched {(suppliers_df['facility_row'] != NO_MATCH).sum()} of {len(suppliers_df)} suppliers; results saved to '{args.output}'.")
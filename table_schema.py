@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+# Explicit in-memory dtypes for the supplier tables (master_dataset.csv, featured_dataset.csv)
+# and the facilities export. Low-cardinality text is categorical, scores and counts are
+# small ints, measures are float32 and flags are real bools, instead of pandas' default
+# object/int64/float64. Coordinates stay float64: float32 rounds them to about a metre.
+#
+# Integer columns fall back to float32 when a value is missing, fractional or out of range,
+# so a load never fails or wraps around; models see the same numbers either way.
+
+CATEGORY = 'category'
+TEXT = 'object'
+
+SUPPLIER_SCHEMA = {
+    'supplierId': TEXT,
+    'name': TEXT,
+    'country': CATEGORY,
+    'industryVertical': CATEGORY,
+    'water_usage_m3': np.float32,
+    'turnover_rate_percent': np.int8,
+    'workplace_accidents_last_year': np.int16,
+    'has_anti_corruption_policy': bool,
+    'publishes_esg_report': bool,
+    'total_emissions_kg_co2e': np.float32,
+    'lat': np.float64,
+    'lng': np.float64,
+    'sector': CATEGORY,
+    # number_of_workers is deliberately not listed: the model uses it as a numeric column when
+    # pandas reads it as one (step2 fills blanks with 0), so its inferred dtype must be kept.
+    'processing_type': CATEGORY,
+    # step2 features
+    'geopolitical_risk': np.int8,
+    'industry_description': CATEGORY,
+    'industry_risk': np.int8,
+    'worker_count_avg': np.float32,
+    'emission_intensity': np.float32,
+    'facility_density': np.float32,
+    'high_risk_neighbours': np.int32,
+    'dyeing_cluster_km': np.float32,
+    'is_iso14001_certified': bool,
+    'is_sa8000_certified': bool,
+    'risk_level': CATEGORY,
+}
+
+FACILITY_SCHEMA = {
+    'os_id': TEXT,
+    'contribution_date': CATEGORY,
+    'name': TEXT,
+    'address': TEXT,
+    'country_code': CATEGORY,
+    'country_name': CATEGORY,
+    'lat': np.float64,
+    'lng': np.float64,
+    'sector': CATEGORY,
+    'contributor (list)': CATEGORY,
+    'number_of_workers': CATEGORY,
+    'parent_company': CATEGORY,
+    'processing_type_facility_type_raw': CATEGORY,
+    'facility_type': CATEGORY,
+    'processing_type': CATEGORY,
+    'product_type': CATEGORY,
+    'is_closed': bool,
+}
+
+TRUE_STRINGS = {'true', 't', 'yes', 'y', '1', '1.0'}
+
+
+def read_dtypes(schema, columns=None):
+    # dtype hints for pd.read_csv: text is parsed straight into categoricals / str and floats
+    # into their final width. Ints and bools are read as inferred and converted afterwards.
+    hints = {}
+    for col, dtype in schema.items():
+        if columns is not None and col not in columns:
+            continue
+        if dtype == CATEGORY:
+            hints[col] = CATEGORY
+        elif dtype == TEXT:
+            hints[col] = str
+        elif dtype is not bool and np.issubdtype(dtype, np.floating):
+            hints[col] = dtype
+    return hints
+
+
+def to_bool(values):
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype(bool)
+    # 'True'/'False' strings (CSV round trips, mixed columns); missing counts as False.
+    codes, uniques = pd.factorize(values)
+    lookup = np.array([str(u).strip().casefold() in TRUE_STRINGS for u in uniques] + [False])
+    return pd.Series(lookup[codes], index=values.index)
+
+
+def to_int(values, dtype):
+    numeric = pd.to_numeric(values, errors='coerce')
+    info = np.iinfo(dtype)
+    finite = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+    if np.isnan(finite).any() or (finite % 1 != 0).any() or (len(finite) and (finite.min() < info.min or finite.max() > info.max)):
+        return numeric.astype(np.float32)
+    return numeric.astype(dtype)
+
+
+def apply_schema(df, schema):
+    # Converts the schema's columns in place (others are left alone) and returns df.
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if dtype == CATEGORY:
+            df[col] = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype(CATEGORY)
+        elif dtype == TEXT:
+            df[col] = values.astype(object)
+        elif dtype is bool:
+            df[col] = to_bool(values)
+        elif np.issubdtype(dtype, np.integer):
+            df[col] = to_int(values, dtype)
+        else:
+            df[col] = pd.to_numeric(values, errors='coerce').astype(dtype)
+    return df
+
+
+def load_table(path, schema, **read_csv_kwargs):
+    usecols = read_csv_kwargs.get('usecols')
+    df = pd.read_csv(path, dtype=read_dtypes(schema, usecols), **read_csv_kwargs)
+    return apply_schema(df, schema)
+
+
+def save_table(df, path, schema):
+    # CSV keeps no dtypes, but converting first writes ints as ints and flags as True/False.
+    apply_schema(df.copy(), schema).to_csv(path, index=False)
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 2 ** 20
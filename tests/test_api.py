@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+import api
+from facility_geo import PROXIMITY_COLUMNS
+from feature_encoder import FeatureEncoder
+
+# Predictions must not depend on which other records share a batch.
+
+PARTIAL_RECORD = {
+    'name': 'Partial Mills', 'country': 'India', 'industryVertical': 'Spinning Mill',
+    'total_emissions_kg_co2e': 26800.0, 'is_iso14001_certified': True, 'is_sa8000_certified': False,
+    'has_anti_corruption_policy': True, 'publishes_esg_report': True,
+}
+FULL_RECORD = {
+    **PARTIAL_RECORD, 'name': 'Full Garments', 'country': 'Bangladesh', 'industryVertical': 'Garment Manufacturing',
+    'water_usage_m3': 50000, 'turnover_rate_percent': 15, 'workplace_accidents_last_year': 2,
+    'number_of_workers': 350, 'lat': 23.81, 'lng': 90.41,
+}
+
+pytestmark = pytest.mark.skipif(api.model is None, reason='model artifacts not available')
+
+
+@pytest.fixture
+def client():
+    return api.app.test_client()
+
+
+def test_micro_batch_matches_single_record():
+    partial = api.validate_record(PARTIAL_RECORD)
+    alone = api.score_records([partial])
+    mixed = api.score_records([partial, api.validate_record(FULL_RECORD)])
+    np.testing.assert_allclose(mixed[0], alone[0], rtol=1e-6)
+
+
+def test_predict_matches_micro_batch(client):
+    response = client.post('/predict', json=PARTIAL_RECORD)
+    assert response.status_code == 200
+    scores = response.get_json()['confidenceScores']
+    batched = api.score_records([api.validate_record(FULL_RECORD), api.validate_record(PARTIAL_RECORD)])[1]
+    np.testing.assert_allclose([scores[c] for c in api.classes], batched, rtol=1e-6)
+
+
+def test_batch_endpoint_matches_single_endpoint(client):
+    single = client.post('/predict', json=PARTIAL_RECORD).get_json()
+    banded = {**FULL_RECORD, 'number_of_workers': '51-200'}
+    batch = client.post('/predict/batch', json=[PARTIAL_RECORD, FULL_RECORD, banded]).get_json()
+    assert batch['predictions'][0] == single
+    assert batch['predictions'][1] == client.post('/predict', json=FULL_RECORD).get_json()
+    assert batch['predictions'][2] == client.post('/predict', json=banded).get_json()
+
+
+def test_missing_geo_index_encodes_proximity_as_missing(monkeypatch):
+    # Without the facility cache the proximity features are unknown, not zero.
+    monkeypatch.setattr(api, 'geo_index', None)
+    featured_df = api.featurize(pd.DataFrame([api.validate_record(FULL_RECORD)]))
+    assert featured_df[PROXIMITY_COLUMNS].isna().all(axis=None)
+    assert np.isnan(FeatureEncoder(PROXIMITY_COLUMNS).transform(featured_df)).all()
@@ -0,0 +1,82 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from feature_encoder import CATEGORICAL_COLS, FeatureEncoder
+from table_schema import SUPPLIER_SCHEMA, load_table
+
+# Both FeatureEncoder paths (DataFrame and records) against the pandas encoding they
+# replace: get_dummies + select_dtypes(['number', 'bool']) + reindex(model columns).
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FEATURED_FILE = os.path.join(REPO_DIR, 'featured_dataset.csv')
+
+MODEL_COLUMNS = [
+    'water_usage_m3', 'total_emissions_kg_co2e', 'number_of_workers', 'has_anti_corruption_policy',
+    'is_sa8000_certified', 'country_China', 'country_India', 'country_USA',
+    'industryVertical_Spinning Mill', 'industryVertical_Weaving & Knitting', 'industry_description_Spinning Mill',
+]
+
+RECORD = {
+    'country': 'India', 'industryVertical': 'Spinning Mill', 'industry_description': 'Spinning Mill',
+    'water_usage_m3': 75000.0, 'total_emissions_kg_co2e': 26800.0, 'number_of_workers': 120,
+    'has_anti_corruption_policy': True, 'is_sa8000_certified': False, 'processing_type': 'Unspecified',
+}
+
+
+def pandas_encoding(df, model_columns, drop_first=False):
+    # drop_first is only right on the full training set (step3), where it drops the same
+    # baseline category the model columns already lack; on a request batch it would drop
+    # whichever category happens to come first.
+    encoded_df = pd.get_dummies(df, columns=[c for c in CATEGORICAL_COLS if c in df.columns], drop_first=drop_first)
+    numeric_df = encoded_df.select_dtypes(include=['number', 'bool'])
+    return numeric_df.reindex(columns=model_columns, fill_value=0).to_numpy(dtype=np.float32)
+
+
+def assert_both_paths_match(encoder, df):
+    expected = pandas_encoding(df, encoder.columns)
+    np.testing.assert_array_equal(encoder._transform_frame(df), expected)
+    np.testing.assert_array_equal(encoder._transform_records(df.to_dict('records')), expected)
+
+
+def test_featured_dataset_matches_training_encoding():
+    df = pd.read_csv(FEATURED_FILE).drop(columns=['risk_level', 'lat', 'lng'])
+    expected_df = pd.get_dummies(df, columns=CATEGORICAL_COLS, drop_first=True).select_dtypes(include=['number', 'bool'])
+    encoder = FeatureEncoder(expected_df.columns)
+    np.testing.assert_array_equal(encoder._transform_frame(df), expected_df.to_numpy(dtype=np.float32))
+    np.testing.assert_array_equal(encoder._transform_records(df.to_dict('records')), expected_df.to_numpy(dtype=np.float32))
+
+
+@pytest.mark.parametrize('n_rows', [1, 2, 7])
+def test_featured_rows(n_rows):
+    df = pd.read_csv(FEATURED_FILE).sample(n_rows, random_state=n_rows).reset_index(drop=True)
+    assert_both_paths_match(FeatureEncoder(MODEL_COLUMNS), df)
+
+
+def test_typed_featured_rows():
+    # Categorical and narrow int dtypes from table_schema encode like pandas' default ones.
+    df = load_table(FEATURED_FILE, SUPPLIER_SCHEMA).head(10)
+    encoder = FeatureEncoder(MODEL_COLUMNS)
+    np.testing.assert_array_equal(encoder._transform_frame(df), pandas_encoding(pd.read_csv(FEATURED_FILE).head(10), MODEL_COLUMNS))
+
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'water_usage_m3': np.nan},
+    {'country': np.nan, 'industryVertical': None},
+    {'country': 'Atlantis', 'industry_description': 'Underwater Basket Weaving'},
+    {'water_usage_m3': '75000'},
+    {'number_of_workers': 'Unspecified'},
+    {'total_emissions_kg_co2e': 0, 'has_anti_corruption_policy': False},
+], ids=['plain', 'nan-numeric', 'missing-category', 'unseen-category', 'string-numeric', 'text-numeric', 'zeros'])
+def test_handcrafted_record(overrides):
+    df = pd.DataFrame([{**RECORD, **overrides}])
+    assert_both_paths_match(FeatureEncoder(MODEL_COLUMNS), df)
+
+
+def test_missing_fields_are_zero():
+    record = {'country': 'USA', 'total_emissions_kg_co2e': 1.5}
+    df = pd.DataFrame([record])
+    encoder = FeatureEncoder(MODEL_COLUMNS)
+    assert_both_paths_match(encoder, df)
+    np.testing.assert_array_equal(encoder.transform(record), encoder._transform_frame(df))
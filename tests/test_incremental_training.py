@@ -0,0 +1,44 @@
+import argparse
+import json
+import os
+import shutil
+import joblib
+import pandas as pd
+import pytest
+import incremental_training
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARTIFACTS = ['esg_risk_model.pkl', 'model_columns.pkl', 'label_encoder.pkl', 'featured_dataset.csv', 'master_dataset.csv']
+
+pytestmark = pytest.mark.skipif(not all(os.path.exists(os.path.join(REPO_DIR, f)) for f in ARTIFACTS),
+                                reason='model artifacts not available')
+
+
+def update_args(**overrides):
+    parser_defaults = dict(store=incremental_training.FEATURE_STORE_FILE, state=incremental_training.STATE_FILE, rounds=5,
+                           full_refit=False, max_churn=0.3, max_label_shift=0.1, max_psi=0.25, max_added_rounds=150, seed=42)
+    return argparse.Namespace(**{**parser_defaults, **overrides})
+
+
+def test_rerunning_the_same_input_changes_nothing(tmp_path, monkeypatch, capsys):
+    for name in ARTIFACTS:
+        shutil.copy(os.path.join(REPO_DIR, name), tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    # A new supplier without certification columns: they are drawn on the first run.
+    new_df = pd.read_csv('master_dataset.csv').head(5)
+    new_df.loc[len(new_df)] = {**new_df.iloc[0].to_dict(), 'supplierId': 'sup_900', 'name': 'New Supplier'}
+    new_df.to_csv('update.csv', index=False)
+
+    incremental_training.run_update('update.csv', update_args())
+    assert '1 new, 0 changed' in capsys.readouterr().out
+    with open(incremental_training.STATE_FILE) as f:
+        rounds_after_first = json.load(f)['rounds_since_full_fit']
+    boosted_after_first = joblib.load('esg_risk_model.pkl').get_booster().num_boosted_rounds()
+
+    incremental_training.run_update('update.csv', update_args())
+    out = capsys.readouterr().out
+    assert '0 new, 0 changed' in out and 'Nothing to update.' in out
+    with open(incremental_training.STATE_FILE) as f:
+        assert json.load(f)['rounds_since_full_fit'] == rounds_after_first
+    assert joblib.load('esg_risk_model.pkl').get_booster().num_boosted_rounds() == boosted_after_first